@@ -28,17 +28,36 @@ from bpy.types import (
 )
 
 from .operators.utils import slide_control_header
-from .operators.export import BSLIDES_OT_install_packages
 from .properties import (
     BSLIDES_PG_wm,
     BSLIDES_PG_scene,
     BSLIDES_PG_text,
 )
-from .handlers import update_scene_number_handler, stop_looping_animation_handler
+from .handlers import (
+    update_text_fields_handler,
+    text_fields_depsgraph_handler,
+    stop_looping_animation_handler,
+    invalidate_slide_index_handler,
+    load_slide_index_handler,
+    telemetry_depsgraph_pre_handler,
+    telemetry_depsgraph_post_handler,
+    telemetry_frame_handler,
+    thumbnail_depsgraph_handler,
+    slide_filter_depsgraph_handler,
+    template_registry_depsgraph_handler,
+)
+from .navigation import subscribe_renames, unsubscribe_renames
+from .prewarm import prewarm
+from .thumbnails import thumbnails
+from .templates import (
+    template_registry,
+    subscribe_template_renames,
+    unsubscribe_template_renames,
+)
 
 from .icons import load_icons, unload_icons
 
-from .operators import export, slide, text
+from .operators import export, playback, slide, text
 from .ui import design_ui, export_ui, slide_ui, text_ui
 from . import properties
 
@@ -83,28 +102,73 @@ class BSLIDES_addonpreference(AddonPreferences):
         default=True,
     )
 
+    prewarm_slides: BoolProperty(
+        name="Prepare Next Slide",
+        description="Evaluate neighbouring slides while idle, so switching is faster",
+        default=True,
+    )
+
+    slide_thumbnails: BoolProperty(
+        name="Slide Thumbnails",
+        description="Render small previews of slides for slide list while idle",
+        default=True,
+    )
+
+    memory_window: IntProperty(
+        name="Slides Kept Loaded",
+        description=(
+            "Number of slides on each side of current one whose images stay "
+            "in memory during slideshow, images of other slides are freed"
+        ),
+        default=2,
+        min=0,
+    )
+
+    memory_budget: IntProperty(
+        name="Image Memory Budget",
+        description="Memory for images during slideshow in MB, 0 is unlimited",
+        default=0,
+        min=0,
+        subtype="UNSIGNED",
+    )
+
+    shared_background: BoolProperty(
+        name="Shared Slide Background",
+        description=(
+            "New slides and Apply to All use one background instead of a copy "
+            "for every slide"
+        ),
+        default=True,
+    )
+
+    template_library: StringProperty(
+        name="Template Library",
+        description=(
+            "Blend file with templates shared by presentations, templates are "
+            "linked from it when first applied"
+        ),
+        default="",
+        subtype="FILE_PATH",
+        update=lambda self, context: template_registry.invalidate(),
+    )
+
     def draw(self, context):
         layout = self.layout
         layout.use_property_split = True
 
         row = layout.row(align=True)
         row.prop(self, "control_location")
-
-        if BSLIDES_OT_install_packages.poll(context):
-            layout.label(
-                text="To Export as PDF, some packages have to be installed.",
-                icon="ERROR",
-            )
-            layout.operator(
-                operator="bslides.install_packages", text="Install Packages"
-            )
-        else:
-            layout.label(text="All Packages are Installed.", icon="CHECKMARK")
+        layout.prop(self, "template_library")
+        layout.prop(self, "memory_window")
+        layout.prop(self, "memory_budget")
 
         layout.use_property_split = False
         row = layout.row(align=True)
         row.prop(self, "loop_animations")
         row.prop(self, "autoplay_animations")
+        layout.prop(self, "prewarm_slides")
+        layout.prop(self, "slide_thumbnails")
+        layout.prop(self, "shared_background")
         if self.loop_animations and self.autoplay_animations:
             layout.label(
                 text="This combination will result in endless cycling!", icon="ERROR"
@@ -119,6 +183,7 @@ class BSLIDES_addonpreference(AddonPreferences):
 
 modules = (
     export,
+    playback,
     slide,
     text,
     design_ui,
@@ -142,31 +207,45 @@ def register():
 
     kc = bpy.context.window_manager.keyconfigs.addon
     if kc:
-        km = kc.keymaps.new(name="3D View", space_type="VIEW_3D")
-        kmi = km.keymap_items.new(
-            "bslides.next_slide", type="RIGHT_ARROW", value="PRESS"
-        )
-        kmi.active = False
-        keymaps.append((km, kmi))
-
-        kmi = km.keymap_items.new(
-            "bslides.previous_slide", type="LEFT_ARROW", value="PRESS"
-        )
-        kmi.active = False
-        keymaps.append((km, kmi))
+        # same keys control live slideshow and playback of pre-rendered slides
+        for name, space_type in (("3D View", "VIEW_3D"), ("Image", "IMAGE_EDITOR")):
+            km = kc.keymaps.new(name=name, space_type=space_type)
+            kmi = km.keymap_items.new(
+                "bslides.next_slide", type="RIGHT_ARROW", value="PRESS"
+            )
+            kmi.active = False
+            keymaps.append((km, kmi))
 
-        kmi = km.keymap_items.new("bslides.exit_slideshow", type="ESC", value="PRESS")
-        kmi.active = False
-        keymaps.append((km, kmi))
+            kmi = km.keymap_items.new(
+                "bslides.previous_slide", type="LEFT_ARROW", value="PRESS"
+            )
+            kmi.active = False
+            keymaps.append((km, kmi))
 
-    bpy.app.handlers.frame_change_post.append(update_scene_number_handler)
+            kmi = km.keymap_items.new(
+                "bslides.exit_slideshow", type="ESC", value="PRESS"
+            )
+            kmi.active = False
+            keymaps.append((km, kmi))
+
+    bpy.app.handlers.frame_change_post.append(update_text_fields_handler)
+    bpy.app.handlers.depsgraph_update_post.append(text_fields_depsgraph_handler)
+    bpy.app.handlers.undo_post.append(invalidate_slide_index_handler)
+    bpy.app.handlers.redo_post.append(invalidate_slide_index_handler)
+    bpy.app.handlers.load_post.append(load_slide_index_handler)
+    bpy.app.handlers.depsgraph_update_pre.append(telemetry_depsgraph_pre_handler)
+    bpy.app.handlers.depsgraph_update_post.append(telemetry_depsgraph_post_handler)
+    bpy.app.handlers.frame_change_post.append(telemetry_frame_handler)
+    bpy.app.handlers.depsgraph_update_post.append(thumbnail_depsgraph_handler)
+    bpy.app.handlers.depsgraph_update_post.append(slide_filter_depsgraph_handler)
+    bpy.app.handlers.depsgraph_update_post.append(template_registry_depsgraph_handler)
+    subscribe_renames()
+    subscribe_template_renames()
 
     bpy.types.VIEW3D_HT_header.append(slide_control_header)
 
     load_icons()
 
-    BSLIDES_OT_install_packages.install_python_user_path()
-
     addon_pref = bpy.context.preferences.addons["blender_slides"].preferences
     if not addon_pref.loop_animations:
         bpy.app.handlers.frame_change_post.append(stop_looping_animation_handler)
@@ -184,7 +263,21 @@ def unregister():
 
     bpy.types.VIEW3D_HT_header.remove(slide_control_header)
 
-    bpy.app.handlers.frame_change_post.remove(update_scene_number_handler)
+    bpy.app.handlers.frame_change_post.remove(update_text_fields_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(text_fields_depsgraph_handler)
+    bpy.app.handlers.undo_post.remove(invalidate_slide_index_handler)
+    bpy.app.handlers.redo_post.remove(invalidate_slide_index_handler)
+    bpy.app.handlers.load_post.remove(load_slide_index_handler)
+    bpy.app.handlers.depsgraph_update_pre.remove(telemetry_depsgraph_pre_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(telemetry_depsgraph_post_handler)
+    bpy.app.handlers.frame_change_post.remove(telemetry_frame_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(thumbnail_depsgraph_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(slide_filter_depsgraph_handler)
+    bpy.app.handlers.depsgraph_update_post.remove(template_registry_depsgraph_handler)
+    thumbnails.release()
+    unsubscribe_renames()
+    unsubscribe_template_renames()
+    prewarm.cancel()
 
     addon_pref = bpy.context.preferences.addons["blender_slides"].preferences
     if not addon_pref.loop_animations:
@@ -0,0 +1,134 @@
+# File: batch.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Export of many presentations in background Blender processes
+
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bpy
+
+CLI_SCRIPT = os.path.join(os.path.dirname(__file__), "cli.py")
+REPORT_NAME = "bslides_batch_report.json"
+
+
+def find_decks(directory):
+    """Returns sorted paths of all .blend files in directory"""
+    return sorted(
+        os.path.join(directory, f)
+        for f in os.listdir(directory)
+        if f.lower().endswith(".blend")
+    )
+
+
+def export_deck(blend_path, output, options, processes, cancelled):
+    """Exports one presentation in background Blender, returns its result"""
+    name = os.path.splitext(os.path.basename(blend_path))[0]
+    cmd = [
+        bpy.app.binary_path,
+        "--background",
+        blend_path,
+        "--python-exit-code",
+        "1",
+        "--python",
+        CLI_SCRIPT,
+        "--",
+        "--output",
+        os.path.join(output, name, ""),
+        "--name",
+        name,
+        *options,
+    ]
+
+    start = time.perf_counter()
+    if cancelled.is_set():
+        return {"deck": blend_path, "seconds": 0.0, "status": "cancelled"}
+
+    # process is kept, so cancel can terminate it
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    processes.append(proc)
+    # cancel came between check above and start, it did not see this process
+    if cancelled.is_set():
+        proc.terminate()
+    stdout, stderr = proc.communicate()
+
+    status = "ok" if proc.returncode == 0 else "failed"
+    if status == "failed" and cancelled.is_set():
+        status = "cancelled"
+
+    result = {
+        "deck": blend_path,
+        "seconds": time.perf_counter() - start,
+        "status": status,
+        "returncode": proc.returncode,
+    }
+    if status == "failed":
+        # last lines usually hold python traceback or export error
+        lines = stdout.decode(errors="replace").splitlines()
+        lines += stderr.decode(errors="replace").splitlines()
+        result["error"] = "\n".join(lines[-10:])
+
+    return result
+
+
+class BatchExport:
+    """Presentations exported by pool of background Blender processes"""
+
+    def __init__(self, decks, output, jobs, options=()):
+        self.decks = decks
+        self.output = output
+        self.start = time.perf_counter()
+        self.processes = []
+        self.cancelled = threading.Event()
+
+        # threads only wait for processes, rendering runs in the processes
+        self.pool = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self.futures = [
+            self.pool.submit(
+                export_deck, deck, output, list(options), self.processes, self.cancelled
+            )
+            for deck in decks
+        ]
+
+    @property
+    def done(self):
+        return sum(f.done() for f in self.futures)
+
+    def finished(self):
+        return all(f.done() for f in self.futures)
+
+    def cancel(self):
+        """Stops all exports, running Blender processes are terminated"""
+        self.cancelled.set()
+        for f in self.futures:
+            f.cancel()
+
+        for proc in list(self.processes):
+            if proc.poll() is None:
+                proc.terminate()
+
+    def report(self):
+        """Waits for all decks, writes summary report into output directory"""
+        results = [
+            {"deck": deck, "seconds": 0.0, "status": "cancelled"}
+            if f.cancelled()
+            else f.result()
+            for deck, f in zip(self.decks, self.futures)
+        ]
+        self.pool.shutdown()
+
+        report = {
+            "decks": results,
+            "failed": sum(r["status"] == "failed" for r in results),
+            "cancelled": sum(r["status"] == "cancelled" for r in results),
+            "seconds": time.perf_counter() - self.start,
+        }
+
+        os.makedirs(self.output, exist_ok=True)
+        with open(os.path.join(self.output, REPORT_NAME), "w") as f:
+            json.dump(report, f, indent=1)
+
+        return report
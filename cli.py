@@ -0,0 +1,436 @@
+# File: cli.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Command line export of presentation
+#
+# Usage:
+#   blender -b deck.blend --python-expr "from blender_slides import cli; cli.main()" -- [options]
+#   blender -b deck.blend --python path/to/blender_slides/cli.py -- [options]
+#
+# Options:
+#   --output DIR         directory for exported presentation (default: next to .blend)
+#   --format PDF|JPG     output format (default: PDF)
+#   --name NAME          file name of PDF (default: Presentation)
+#   --hidden             export hidden slides too
+#   --only-hidden        export only hidden slides
+#   --slides RANGES      slide positions in slide list, e.g. 1-5,8 (default: all)
+#   --workers N          number of background Blender processes, 0 renders in place
+#   --engine ENGINE      CYCLES or SCENE, engine used by background processes
+#   --no-cache           render all slides even when unchanged
+#   --in-memory          put rendered slides straight into PDF
+#   --switch-latency     measure time of switching to every slide, no export
+#   --no-prewarm         measure switches without evaluating next slide ahead
+#   --pdf-benchmark N    memory of writing PDF with N pages, sampled as pages are added,
+#                        time and size are compared with Pillow when it is installed
+#   --frame-benchmark N  time per playback frame of slide number update, old and new,
+#                        with N synthetic slides added
+#   --list-benchmark N   time filtering of slide list with N synthetic slides added
+#   --copy-benchmark N   memory of copying object to N synthetic slides
+#   --copy-mode MODE     COPY, LINK or INSTANCE, run each mode in its own process
+#
+# Per-slide timings are printed to stdout as JSON. Exit status is 0 on success,
+# 1 when export failed and 2 for invalid arguments.
+#
+# Batch export of all .blend files in directory, no deck is opened:
+#   blender -b --python path/to/blender_slides/cli.py -- --batch DECKS [options]
+#
+#   --batch DIR          export every .blend file in DIR, each into OUTPUT/<deck>/
+#   --jobs N             number of decks exported at once (default: CPU count)
+#
+# Summary with wall time and failures of every deck is written into OUTPUT.
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import bpy
+
+
+def parse_ranges(text):
+    """Returns set of 1-based positions from text like 1-5,8"""
+    from .operators.utils import parse_ranges as parse
+
+    try:
+        return parse(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid slide range: {text}")
+
+
+def parse_args(argv):
+    """Parses arguments given to script after --"""
+    args = argv[argv.index("--") + 1 :] if "--" in argv else []
+
+    parser = argparse.ArgumentParser(
+        prog="blender -b deck.blend --python cli.py --",
+        description="Export BSlides presentation",
+    )
+    parser.add_argument("--output", default="//")
+    parser.add_argument("--format", choices=("PDF", "JPG"), default="PDF")
+    parser.add_argument("--name", default="Presentation")
+    visibility = parser.add_mutually_exclusive_group()
+    visibility.add_argument("--hidden", action="store_true")
+    visibility.add_argument("--only-hidden", action="store_true")
+    parser.add_argument("--slides", type=parse_ranges)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--engine", choices=("CYCLES", "SCENE"), default="CYCLES")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--in-memory", action="store_true")
+    parser.add_argument("--switch-latency", action="store_true")
+    parser.add_argument("--no-prewarm", action="store_true")
+    parser.add_argument("--pdf-benchmark", type=int, default=0)
+    parser.add_argument("--frame-benchmark", type=int, default=0)
+    parser.add_argument("--list-benchmark", type=int, default=0)
+    parser.add_argument("--copy-benchmark", type=int, default=0)
+    parser.add_argument(
+        "--copy-mode", choices=("COPY", "LINK", "INSTANCE"), default="COPY"
+    )
+    parser.add_argument("--batch")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+
+    return parser.parse_args(args)
+
+
+def ensure_addon():
+    """Enables addon when blender was started without it"""
+    if hasattr(bpy.types.Scene, "bslides"):
+        return
+
+    import addon_utils
+
+    addon_utils.enable(__package__, default_set=True)
+
+
+def export(args):
+    """Exports slides chosen by arguments, returns summary of export"""
+    from .operators.export import ExportJob, selected_scenes
+
+    addon = bpy.context.window_manager.bslides
+    addon.output_directory = args.output
+    addon.file_format = args.format
+    addon.file_name = args.name
+    addon.visible_slides = not args.only_hidden
+    addon.hidden_slides = args.hidden or args.only_hidden
+    addon.parallel_export = args.workers > 0
+    addon.export_workers = max(args.workers, 1)
+    addon.worker_engine = args.engine
+    addon.use_render_cache = not args.no_cache
+    addon.in_memory_export = args.in_memory
+
+    scenes = selected_scenes(addon)
+    if args.slides:
+        positions = {s.name: i for i, s in enumerate(bpy.data.scenes, start=1)}
+        scenes = [s for s in scenes if positions[s.name] in args.slides]
+
+    if not scenes:
+        raise RuntimeError("No slides selected for export")
+
+    job = ExportJob(addon, scenes)
+    job.render_all()
+    size = job.finish()
+
+    return {
+        "slides": job.timings,
+        "reused": job.reused,
+        "seconds": time.perf_counter() - job.start,
+        "directory": job.directory,
+        "size": size,
+        "temporary_files": job.temporary_files,
+    }
+
+
+def resident_memory():
+    """Returns bytes of memory used by blender process, None when unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def benchmark_jpeg(directory, width=3840, height=2160):
+    """Saves 4K JPEG image used as every page of benchmark PDF"""
+    image = bpy.data.images.new("Benchmark Page", width, height)
+    image.generated_type = "COLOR_GRID"
+    image.filepath_raw = os.path.join(directory, "page.jpg")
+    image.file_format = "JPEG"
+    image.save()
+    bpy.data.images.remove(image)
+    return os.path.join(directory, "page.jpg")
+
+
+def pdf_benchmark(count):
+    """Returns memory of process as pages are added to PDF, one page at a time"""
+    from .pdf import PdfWriter, jpeg_file_page
+
+    directory = tempfile.mkdtemp(prefix="bslides_")
+    page = benchmark_jpeg(directory)
+    filepath = os.path.join(directory, "benchmark.pdf")
+
+    # memory should stay flat, only current page is held
+    step = max(1, count // 10)
+    samples = [[0, resident_memory()]]
+    start = time.perf_counter()
+    with PdfWriter(filepath) as pdf:
+        for idx in range(1, count + 1):
+            pdf.add_page(jpeg_file_page(page))
+            if idx % step == 0 or idx == count:
+                samples.append([idx, resident_memory()])
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(filepath)
+
+    report = {
+        "pages": count,
+        "seconds": seconds,
+        "size": size,
+        "memory": samples,
+        "pillow": pillow_benchmark(page, count, directory),
+    }
+
+    shutil.rmtree(directory)
+    return report
+
+
+def pillow_benchmark(page, count, directory):
+    """Returns time and size of PDF written by Pillow, None without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    # previous export, every page is decoded and encoded again by Pillow
+    filepath = os.path.join(directory, "pillow.pdf")
+    start = time.perf_counter()
+    images = [Image.open(page) for _ in range(count)]
+    images[0].save(
+        filepath,
+        "PDF",
+        resolution=100.0,
+        save_all=True,
+        append_images=images[1:],
+    )
+    memory = resident_memory()
+    for image in images:
+        image.close()
+
+    return {
+        "seconds": time.perf_counter() - start,
+        "size": os.path.getsize(filepath),
+        "memory": memory,
+    }
+
+
+def legacy_slide_number_handler(scene):
+    """Slide number update which scanned all slides on every frame"""
+    visible = [s for s in bpy.data.scenes if s.bslides.render_slide]
+
+    try:
+        ob = scene.objects["Slide Number"]
+        idx = visible.index(scene)
+    except (KeyError, ValueError):
+        return
+
+    ob.data.body = f"{idx+1}/{len(visible)}"
+
+
+def frame_benchmark(count, frames=250):
+    """Returns seconds per frame change with old and current slide number update"""
+    from .handlers import update_text_fields_handler
+
+    scene = bpy.context.scene
+    for idx in range(count):
+        bpy.data.scenes.new(f"Slide {idx:05d}")
+
+    if "Slide Number" not in scene.objects:
+        curve = bpy.data.curves.new("Slide Number", "FONT")
+        scene.collection.objects.link(bpy.data.objects.new("Slide Number", curve))
+
+    def measure():
+        start = time.perf_counter()
+        for frame in range(frames):
+            scene.frame_set(scene.frame_start + frame)
+        return (time.perf_counter() - start) / frames
+
+    after = measure()
+
+    # same frames with handler this addon used before
+    handlers = bpy.app.handlers.frame_change_post
+    handlers.remove(update_text_fields_handler)
+    handlers.append(legacy_slide_number_handler)
+    try:
+        before = measure()
+    finally:
+        handlers.remove(legacy_slide_number_handler)
+        handlers.append(update_text_fields_handler)
+
+    return {
+        "slides": len(bpy.data.scenes),
+        "frames": frames,
+        "before": before,
+        "after": after,
+    }
+
+
+def list_benchmark(count, repeat=100):
+    """Returns seconds of slide list filtering with synthetic slides added"""
+    from .fields import fields
+    from .navigation import slide_filter
+
+    for idx in range(count):
+        scene = bpy.data.scenes.new(f"Slide {idx:05d}")
+        scene.bslides.render_slide = idx % 7 != 0
+
+    scenes = bpy.data.scenes
+    titles = fields.slide_titles()
+    titles_version = fields.versions["titles"]
+
+    def measure(options, cached):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            if not cached:
+                slide_filter.invalidate()
+            slide_filter.filter(scenes, options, titles, titles_version, 1)
+        return (time.perf_counter() - start) / repeat
+
+    options = {
+        "unfiltered": ("", "", "ALL", "", "ORDER", False),
+        "name": ("slide 01", "", "ALL", "", "ORDER", False),
+        "hidden": ("", "", "HIDDEN", "", "ORDER", False),
+        "sorted": ("", "", "ALL", "", "NAME", True),
+    }
+
+    return {
+        "slides": len(scenes),
+        "redraw": {
+            name: {"uncached": measure(o, False), "cached": measure(o, True)}
+            for name, o in options.items()
+        },
+    }
+
+
+def copy_benchmark(count, mode, vertices=10000):
+    """Returns objects and memory added by copying mesh to synthetic slides"""
+    from .operators.slide import copy_to_slides
+
+    # freed memory is reused by later allocations, so one mode is measured
+    # per process and each run starts from the same state
+    mesh = bpy.data.meshes.new("Benchmark Logo")
+    mesh.from_pydata([(i * 0.001, 0.0, 0.0) for i in range(vertices)], [], [])
+    logo = bpy.data.objects.new("Benchmark Logo", mesh)
+    bpy.context.scene.collection.objects.link(logo)
+
+    scenes = [bpy.data.scenes.new(f"Slide {idx:05d}") for idx in range(count)]
+
+    def measure():
+        # depsgraph of every slide is built, as when slides are shown
+        for s in scenes:
+            s.view_layers[0].depsgraph.update()
+        return len(bpy.data.objects), len(bpy.data.meshes), resident_memory()
+
+    before = measure()
+    start = time.perf_counter()
+    copy_to_slides(logo, scenes, mode)
+    seconds = time.perf_counter() - start
+    after = measure()
+
+    return {
+        "mode": mode,
+        "slides": count,
+        "seconds": seconds,
+        "objects": [before[0], after[0]],
+        "meshes": [before[1], after[1]],
+        "memory": [before[2], after[2]],
+    }
+
+
+def deck_options(argv):
+    """Returns arguments passed on to export of every deck in batch"""
+    args = argv[argv.index("--") + 1 :]
+
+    options = []
+    skip = False
+    for arg in args:
+        if skip:
+            skip = False
+        elif arg in ("--batch", "--jobs", "--output", "--name"):
+            skip = True
+        elif not arg.startswith(("--batch=", "--jobs=", "--output=", "--name=")):
+            options.append(arg)
+
+    return options
+
+
+def export_batch(args, argv):
+    """Exports every deck in batch directory, returns summary report"""
+    from .batch import BatchExport, find_decks
+
+    directory = bpy.path.abspath(args.batch)
+    output = bpy.path.abspath(args.output) if args.output != "//" else directory
+
+    decks = find_decks(directory)
+    if not decks:
+        raise RuntimeError(f"No .blend files in {directory}")
+
+    return BatchExport(decks, output, args.jobs, deck_options(argv)).report()
+
+
+def main(argv=None):
+    """Runs export, exits blender with status code"""
+    argv = sys.argv if argv is None else argv
+    args = parse_args(argv)
+
+    if args.batch:
+        try:
+            report = export_batch(args, argv)
+        except (RuntimeError, OSError) as e:
+            print(json.dumps({"error": str(e)}))
+            sys.exit(1)
+
+        print(json.dumps(report, indent=1))
+        sys.exit(1 if report["failed"] else 0)
+
+    ensure_addon()
+
+    if args.pdf_benchmark:
+        print(json.dumps(pdf_benchmark(args.pdf_benchmark), indent=1))
+        sys.exit(0)
+
+    if args.frame_benchmark:
+        print(json.dumps(frame_benchmark(args.frame_benchmark), indent=1))
+        sys.exit(0)
+
+    if args.list_benchmark:
+        print(json.dumps(list_benchmark(args.list_benchmark), indent=1))
+        sys.exit(0)
+
+    if args.copy_benchmark:
+        report = copy_benchmark(args.copy_benchmark, args.copy_mode)
+        print(json.dumps(report, indent=1))
+        sys.exit(0)
+
+    if args.switch_latency:
+        from .prewarm import measure_switches
+
+        timings = measure_switches(use_prewarm=not args.no_prewarm)
+        print(json.dumps({"slides": timings}, indent=1))
+        sys.exit(0)
+
+    try:
+        summary = export(args)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
+
+    print(json.dumps(summary, indent=1))
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    # run as script, import addon as package so relative imports work
+    import importlib
+
+    addon_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, os.path.dirname(addon_dir))
+    importlib.import_module(f"{os.path.basename(addon_dir)}.cli").main()
@@ -0,0 +1,224 @@
+# File: fields.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Dynamic text fields like {slide}/{total} evaluated per slide
+
+import string
+from datetime import datetime
+import bpy
+from .navigation import slide_index
+
+# template used by slide number objects made before fields existed
+SLIDE_NUMBER_TEMPLATE = "{slide}/{total}"
+
+DEFAULT_DATE_FORMAT = "%d-%m-%Y"
+
+formatter = string.Formatter()
+
+
+class DateValue:
+    """Current date, format spec of field is passed to strftime"""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __format__(self, spec):
+        return self.now.strftime(spec or DEFAULT_DATE_FORMAT)
+
+
+class FieldValues:
+    """Mapping used by str.format_map, values are computed on first use"""
+
+    def __init__(self, engine, scene):
+        self.engine = engine
+        self.scene = scene
+
+    def __getitem__(self, key):
+        value = self.engine.value(key, self.scene)
+        if value is None:
+            # unknown token stays in text as it was typed
+            return f"{{{key}}}"
+        return value
+
+
+class FieldEngine:
+    """Evaluates text fields, results are kept until their inputs change"""
+
+    def __init__(self):
+        # version of every kind of input, fields depending on it are
+        # evaluated again only when it changes
+        self.versions = {"titles": 0, "sections": 0, "objects": 0}
+
+        # input values shared by all slides, filled lazily
+        self.titles = None
+        self.titles_version = None
+        self.sections = None
+        self.sections_version = None
+
+        # template -> names of tokens it uses
+        self.tokens = {}
+        # (template, slide name) -> (inputs, text)
+        self.results = {}
+        # slide name -> (inputs, names of text objects with fields)
+        self.objects = {}
+        # (type, name) of text objects and curves whose body was written,
+        # depsgraph handlers use it to tell these updates from user edits
+        self.written = set()
+
+    def invalidate(self, kind):
+        """Marks input as changed, e.g. 'titles', 'sections' or 'objects'"""
+        self.versions[kind] += 1
+
+    def _inputs(self, token):
+        """Returns value which changes whenever input of token changes"""
+        if token in ("slide", "total"):
+            return slide_index.version()
+        if token == "title":
+            return self.versions["titles"]
+        if token == "section":
+            return slide_index.version(), self.versions["sections"]
+        if token == "date":
+            # fields with time are updated once a minute at most
+            return datetime.now().strftime("%Y%m%d%H%M")
+        if token == "deck":
+            return bpy.data.filepath
+        return None
+
+    def slide_titles(self):
+        """Returns title of every slide, keyed by slide name"""
+        version = self.versions["titles"]
+        if self.titles_version != version:
+            self.titles = {}
+            for s in bpy.data.scenes:
+                title = next(
+                    (
+                        o
+                        for o in s.objects
+                        if o.type == "FONT" and o.name.lower().startswith("title")
+                    ),
+                    None,
+                )
+                self.titles[s.name] = title.data.body if title else ""
+            self.titles_version = version
+
+        return self.titles
+
+    def slide_sections(self):
+        """Returns section of every slide, inherited from preceding slides"""
+        version = (slide_index.version(), self.versions["sections"])
+        if self.sections_version != version:
+            self.sections = {}
+            section = ""
+            for s in bpy.data.scenes:
+                if s.bslides.section:
+                    section = s.bslides.section
+                self.sections[s.name] = section
+            self.sections_version = version
+
+        return self.sections
+
+    def value(self, token, scene):
+        """Returns value of token for slide or None for unknown token"""
+        if token == "slide":
+            number = slide_index.slide_number(scene)
+            return number if number is not None else ""
+        if token == "total":
+            return slide_index.total
+        if token == "title":
+            return self.slide_titles().get(scene.name, "")
+        if token == "section":
+            return self.slide_sections().get(scene.name, "")
+        if token == "date":
+            return DateValue(datetime.now())
+        if token == "deck":
+            return bpy.path.display_name_from_filepath(bpy.data.filepath)
+        return None
+
+    def _template_tokens(self, template):
+        """Returns names of tokens used in template"""
+        tokens = self.tokens.get(template)
+        if tokens is None:
+            try:
+                tokens = tuple(
+                    {name for _, name, _, _ in formatter.parse(template) if name}
+                )
+            except ValueError:
+                tokens = ()
+            self.tokens[template] = tokens
+
+        return tokens
+
+    def evaluate(self, template, scene):
+        """Returns text of template for slide, reuses result if inputs are same"""
+        tokens = self._template_tokens(template)
+        inputs = tuple(self._inputs(t) for t in tokens)
+
+        key = (template, scene.name)
+        cached = self.results.get(key)
+        if cached and cached[0] == inputs:
+            return cached[1]
+
+        try:
+            text = template.format_map(FieldValues(self, scene))
+        except (ValueError, AttributeError, IndexError):
+            # broken template is shown as it is
+            text = template
+
+        self.results[key] = (inputs, text)
+        return text
+
+    def field_objects(self, scene):
+        """Returns text objects with fields in slide"""
+        inputs = (len(scene.objects), self.versions["objects"])
+        cached = self.objects.get(scene.name)
+        if cached and cached[0] == inputs:
+            names = cached[1]
+        else:
+            names = [
+                o.name
+                for o in scene.objects
+                if o.type == "FONT" and field_template(o) is not None
+            ]
+            self.objects[scene.name] = (inputs, names)
+
+        objects = scene.objects
+        return [objects[n] for n in names if n in objects]
+
+    def refresh(self, scene):
+        """Writes evaluated fields into text objects of slide"""
+        for ob in self.field_objects(scene):
+            text = self.evaluate(field_template(ob), scene)
+
+            # writing body re-evaluates text object, skip it when nothing changed
+            if ob.data.body != text:
+                ob.data.body = text
+                self.written.add(id_key(ob))
+                self.written.add(id_key(ob.data))
+
+    def take_written(self):
+        """Returns keys of data written since last call and forgets them"""
+        written = self.written
+        self.written = set()
+        return written
+
+    def clear(self):
+        """Forgets all cached values, e.g. after loading file"""
+        self.__init__()
+
+
+def id_key(data):
+    """Returns key of data-block used in set of written data"""
+    return data.bl_rna.identifier, data.name
+
+
+def field_template(ob):
+    """Returns field template of text object or None when it has no fields"""
+    data = ob.data
+    if data.bslides.use_fields:
+        return data.bslides.template
+    if ob.name == "Slide Number":
+        return SLIDE_NUMBER_TEMPLATE
+    return None
+
+
+fields = FieldEngine()
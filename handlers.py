@@ -5,31 +5,164 @@
 
 import bpy
 from bpy.app.handlers import persistent
+from .navigation import (
+    slide_index,
+    slide_filter,
+    slide_number_changes,
+    subscribe_renames,
+)
+from .fields import fields, id_key
+from .prewarm import prewarm
+from .telemetry import telemetry
+from .thumbnails import thumbnails
+from .templates import template_registry, subscribe_template_renames
 
 
 @persistent
-def update_scene_number_handler(scene):
-    """Used to update slide number"""
-    # list of all slides with enabled render
-    visible = [s for s in bpy.data.scenes if s.bslides.render_slide]
+def update_text_fields_handler(scene):
+    """Used to update slide number and other text fields"""
+    # fields are evaluated again only when their inputs changed
+    fields.refresh(scene)
 
-    # slide does not have a slide number
-    try:
-        ob = scene.objects["Slide Number"]
-    except KeyError:
-        return
-
-    # slide is hidden, dont count it
-    try:
-        idx = visible.index(scene)
-    except ValueError:
-        return
 
-    ob.data.body = f"{idx+1}/{len(visible)}"
+@persistent
+def text_fields_depsgraph_handler(scene, depsgraph):
+    """Notices edited titles which are used by {title} fields"""
+    for update in depsgraph.updates:
+        ob = update.id
+        if (
+            isinstance(ob, bpy.types.Object)
+            and update.is_updated_geometry
+            and ob.name.lower().startswith("title")
+        ):
+            fields.invalidate("titles")
+            return
 
 
 @persistent
 def stop_looping_animation_handler(scene):
     """Stops animation from looping"""
     if scene.frame_current == scene.frame_end:
-        bpy.ops.screen.animation_cancel(restore_frame=False)
\ No newline at end of file
+        bpy.ops.screen.animation_cancel(restore_frame=False)
+
+
+@persistent
+def invalidate_slide_index_handler(*args):
+    """Rebuilds slide order after undo, redo or loading file"""
+    slide_index.invalidate()
+    slide_filter.invalidate()
+    template_registry.invalidate()
+    fields.invalidate("titles")
+    fields.invalidate("sections")
+    fields.invalidate("objects")
+
+
+@persistent
+def load_slide_index_handler(*args):
+    """Message bus subscriptions are cleared when new file is loaded"""
+    slide_index.invalidate()
+    slide_filter.invalidate()
+    # pending toggles of previous file, new file starts without any
+    slide_number_changes.clear()
+    fields.clear()
+    prewarm.cancel()
+    thumbnails.clear()
+    template_registry.invalidate()
+    subscribe_renames()
+    subscribe_template_renames()
+
+
+@persistent
+def telemetry_depsgraph_pre_handler(*args):
+    """Start of depsgraph evaluation after slide switch"""
+    telemetry.depsgraph_pre()
+
+
+@persistent
+def telemetry_depsgraph_post_handler(*args):
+    """End of depsgraph evaluation after slide switch"""
+    telemetry.depsgraph_post()
+
+
+@persistent
+def telemetry_frame_handler(scene):
+    """First frame of slide after switch"""
+    telemetry.frame_change()
+
+
+@persistent
+def thumbnail_depsgraph_handler(scene, depsgraph=None):
+    """Edited slides get new thumbnail, also those sharing edited data"""
+    written = fields.take_written()
+
+    # older blender passes only scene
+    if depsgraph is None:
+        thumbnails.invalidate(scene.name)
+        return
+
+    # bodies written by text fields, e.g. around thumbnail renders, are not
+    # edits, shared "Slide Number" object would invalidate every slide
+    updates = [
+        u.id.original
+        for u in depsgraph.updates
+        if id_key(u.id.original) not in written
+    ]
+    if written and all(isinstance(d, bpy.types.Scene) for d in updates):
+        return
+
+    thumbnails.invalidate(scene.name)
+
+    # shared world, template, material, ... changes every slide using it
+    shared = set()
+    objects = []
+    for data in updates:
+        if isinstance(data, bpy.types.Scene):
+            thumbnails.invalidate(data.name)
+        elif isinstance(data, bpy.types.Object):
+            for s in data.users_scene:
+                thumbnails.invalidate(s.name)
+            objects.append(data)
+        else:
+            shared.add(data)
+
+    if shared:
+        thumbnails.invalidate_users(shared)
+    # objects shared through instanced collection are not linked to slides
+    if objects:
+        thumbnails.invalidate_instancers(objects)
+
+
+@persistent
+def slide_filter_depsgraph_handler(scene, depsgraph=None):
+    """Slide list is filtered again after change, e.g. linked template"""
+    # older blender passes only scene
+    if (
+        depsgraph is None
+        or depsgraph.id_type_updated("COLLECTION")
+        or depsgraph.id_type_updated("SCENE")
+    ):
+        slide_filter.invalidate()
+        return
+
+    # edited title changes result of title filter
+    for update in depsgraph.updates:
+        ob = update.id
+        if (
+            isinstance(ob, bpy.types.Object)
+            and update.is_updated_geometry
+            and ob.name.lower().startswith("title")
+        ):
+            slide_filter.invalidate()
+            return
+
+
+@persistent
+def template_registry_depsgraph_handler(scene, depsgraph=None):
+    """Templates are listed again after collections change"""
+    # older blender passes only scene
+    if (
+        depsgraph is None
+        or depsgraph.id_type_updated("COLLECTION")
+        or depsgraph.id_type_updated("SCENE")
+    ):
+        template_registry.invalidate()
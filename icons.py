@@ -25,6 +25,9 @@ def load_icons():
     global preview_collections
     preview_collections["icons"] = pcoll
 
+    # slide thumbnails are added while slide list is drawn
+    preview_collections["thumbnails"] = bpy.utils.previews.new()
+
 
 def unload_icons():
     """Removes all custom icons from collection"""
@@ -0,0 +1,74 @@
+# File: memory.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Keeps images of nearby slides loaded, frees the rest
+
+import bpy
+
+MEGABYTE = 1024 * 1024
+
+
+def image_bytes(image):
+    """Returns estimated memory of loaded image, 0 when it is not loaded"""
+    # reading size of image which is not loaded would load it
+    if not image.has_data:
+        return 0
+
+    width, height = image.size
+    channel_bytes = 4 if image.is_float else 1
+    return width * height * image.channels * channel_bytes
+
+
+def resident_bytes():
+    """Returns estimated memory of all loaded images"""
+    return sum(image_bytes(image) for image in bpy.data.images)
+
+
+class ImageWindow:
+    """Images of slides around current one, older images are freed"""
+
+    def __init__(self):
+        # names of images loaded for slides inside window
+        self.resident = set()
+        # image name -> bytes when it was last loaded, estimates unloaded images
+        self.sizes = {}
+
+    def update(self, slides, position, images_of, radius, budget=0):
+        """Keeps images of radius slides on each side, frees others"""
+        # nearest slides go first, farther ones are dropped once budget in bytes
+        # would be exceeded, images of current slide are kept even over budget
+        first = max(0, position - radius)
+        last = min(len(slides), position + radius + 1)
+        order = sorted(range(first, last), key=lambda idx: abs(idx - position))
+
+        keep = set()
+        total = 0
+        for idx in order:
+            images = [i for i in images_of(slides[idx]) if i.name not in keep]
+
+            size = 0
+            for image in images:
+                if image.has_data:
+                    self.sizes[image.name] = image_bytes(image)
+                size += self.sizes.get(image.name, 0)
+
+            if budget and keep and total + size > budget:
+                break
+
+            keep.update(i.name for i in images)
+            total += size
+
+        for name in self.resident - keep:
+            image = bpy.data.images.get(name)
+            if image and image.has_data:
+                image.buffers_free()
+
+        self.resident = keep
+        return total
+
+    def clear(self):
+        self.resident.clear()
+        self.sizes.clear()
+
+
+image_window = ImageWindow()
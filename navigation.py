@@ -0,0 +1,201 @@
+# File: navigation.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Cached order of slides used for navigation and numbering
+
+import bpy
+from .templates import template_registry
+
+# owner of scene rename subscription
+msgbus_owner = object()
+
+
+class SlideIndex:
+    """Ordered visible slides with neighbours, rebuilt after structural change"""
+
+    def __init__(self):
+        self.valid = False
+        # increased on every rebuild, lets others cache values derived from index
+        self.rebuilds = 0
+        # number of scenes when index was built, catches added/removed slides
+        self.count = 0
+        # names of visible slides in order
+        self.visible = []
+        # slide name -> 1-based number among visible slides
+        self.number = {}
+        # slide name -> index in bpy.data.scenes
+        self.position = {}
+        # slide name -> name of nearest visible slide after/before it
+        self.next = {}
+        self.previous = {}
+
+    def invalidate(self):
+        self.valid = False
+
+    def ensure(self):
+        """Rebuilds index when it is out of date, otherwise does nothing"""
+        scenes = bpy.data.scenes
+        if self.valid and self.count == len(scenes):
+            return
+
+        self.visible = []
+        self.number = {}
+        self.position = {}
+        self.next = {}
+        self.previous = {}
+
+        names = [s.name for s in scenes]
+        render = [s.bslides.render_slide for s in scenes]
+
+        last = None
+        for idx, name in enumerate(names):
+            self.position[name] = idx
+            self.previous[name] = last
+            if render[idx]:
+                self.visible.append(name)
+                self.number[name] = len(self.visible)
+                last = name
+
+        last = None
+        for idx in reversed(range(len(names))):
+            self.next[names[idx]] = last
+            if render[idx]:
+                last = names[idx]
+
+        self.count = len(scenes)
+        self.valid = True
+        self.rebuilds += 1
+
+    def version(self):
+        """Returns number which changes whenever slide order changes"""
+        self.ensure()
+        return self.rebuilds
+
+    @property
+    def total(self):
+        self.ensure()
+        return len(self.visible)
+
+    def next_slide(self, scene):
+        """Returns visible slide following scene or None"""
+        self.ensure()
+        name = self.next.get(scene.name)
+        return bpy.data.scenes.get(name) if name else None
+
+    def previous_slide(self, scene):
+        """Returns visible slide preceding scene or None"""
+        self.ensure()
+        name = self.previous.get(scene.name)
+        return bpy.data.scenes.get(name) if name else None
+
+    def slide(self, number):
+        """Returns visible slide with given 1-based number or None"""
+        self.ensure()
+        if 1 <= number <= len(self.visible):
+            return bpy.data.scenes.get(self.visible[number - 1])
+        return None
+
+    def slide_number(self, scene):
+        """Returns 1-based number of slide among visible or None when hidden"""
+        self.ensure()
+        return self.number.get(scene.name)
+
+    def slide_number_of(self, name):
+        """Returns number of slide with given name or None when hidden"""
+        self.ensure()
+        return self.number.get(name)
+
+
+slide_index = SlideIndex()
+
+
+class SlideFilter:
+    """Filter flags and order of slide list, kept until slides or filter change"""
+
+    def __init__(self):
+        # increased after every change of blender data, e.g. linked template
+        self.version = 0
+        self.key = None
+        self.flags = []
+        self.order = []
+        self.has_slide_number = False
+
+    def invalidate(self):
+        self.version += 1
+
+    def filter(self, scenes, options, titles, titles_version, bitflag):
+        """Returns flags and new order of scenes for list, both empty when unused"""
+        # options are name, title, visibility, template, sort and reverse,
+        # titles maps slide name to its title text
+        key = (options, self.version, slide_index.version(), titles_version)
+        if key == self.key:
+            return self.flags, self.order
+
+        name, title, visibility, template, sort, reverse = options
+        name, title, template = name.lower(), title.lower(), template.lower()
+
+        # drawn in every row, looked up once here instead
+        self.has_slide_number = "Slide Number" in bpy.data.objects
+
+        flags = []
+        if template:
+            template_registry.ensure()
+        if name or title or template or visibility != "ALL":
+            for s in scenes:
+                shown = (
+                    (not name or name in s.name.lower())
+                    and (not title or title in titles.get(s.name, "").lower())
+                    and (
+                        visibility == "ALL"
+                        or s.bslides.render_slide == (visibility == "VISIBLE")
+                    )
+                    and (
+                        not template
+                        or any(
+                            template in t.lower()
+                            for t in template_registry.linked.get(s.name, ())
+                        )
+                    )
+                )
+                flags.append(bitflag if shown else 0)
+
+        order = []
+        if sort != "ORDER" or reverse:
+            if sort == "NAME":
+                keys = [s.name.lower() for s in scenes]
+            elif sort == "TITLE":
+                keys = [titles.get(s.name, "").lower() for s in scenes]
+            else:
+                keys = list(range(len(scenes)))
+
+            # order holds new position of every item
+            ranked = sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+            order = [0] * len(keys)
+            for position, idx in enumerate(ranked):
+                order[idx] = position
+
+        self.key = key
+        self.flags = flags
+        self.order = order
+        return flags, order
+
+
+slide_filter = SlideFilter()
+
+# names of slides which changed slide_number_enable since last refresh
+slide_number_changes = set()
+
+
+def subscribe_renames():
+    """Invalidates index whenever any scene is renamed"""
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Scene, "name"),
+        owner=msgbus_owner,
+        args=(),
+        notify=slide_index.invalidate,
+    )
+
+
+def unsubscribe_renames():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
@@ -4,61 +4,458 @@
 # Description: Functionality for exporting
 
 import subprocess
-import sys
 import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import bpy
 from bpy.types import Operator
-import bpy
-from .utils import get_python_path
+from bpy.props import StringProperty
+from ..batch import BatchExport, find_decks
+from ..fields import fields
+from ..pdf import (
+    PdfWriter,
+    jpeg_page,
+    jpeg_file_page,
+)
+from ..render_cache import (
+    scene_fingerprint,
+    load_manifest,
+    save_manifest,
+    is_cached,
+    is_complete_jpeg,
+    Journal,
+)
+from .pixels import (
+    view_colorspace,
+    render_pixels,
+    encode_page,
+)
 
+WORKER_SCRIPT = os.path.join(os.path.dirname(__file__), "export_worker.py")
 
-class BSLIDES_OT_install_packages(Operator):
-    """Installs Python packages into Blender for PDF export"""
+# slides rendered for PDF are kept here, so next export can reuse them
+CACHE_DIRECTORY = "bslides_cache"
 
-    bl_idname = "bslides.install_packages"
-    bl_label = "Install Packages"
 
-    @classmethod
-    def poll(cls, context):
-        try:
-            import PIL
+def selected_scenes(addon):
+    """Returns scenes chosen for export in export settings"""
+    if addon.visible_slides and addon.hidden_slides:
+        return list(bpy.data.scenes)
+    elif addon.visible_slides:
+        return [s for s in bpy.data.scenes if s.bslides.render_slide]
+    elif addon.hidden_slides:
+        return [s for s in bpy.data.scenes if not s.bslides.render_slide]
 
-            return False
-        except ModuleNotFoundError:
-            return True
+    return []
 
-    @classmethod
-    def install_python_user_path(cls):
-        """Install python into user sys.path"""
-        # python --user path location is not in sys.path by default
-        python_path = get_python_path()
-        user_path = subprocess.check_output(
-            [str(python_path), "-m", "site", "--user-site"]
-        )
 
-        # convert from byte to string without whitespaces
-        user_path = user_path.decode("utf-8").strip()
+def slide_fingerprints(scenes, engine):
+    """Returns fingerprint of every scene, keyed by scene name"""
+    # text fields like slide number are hashed with their value for each slide
+    return {s.name: scene_fingerprint(s, engine) for s in scenes}
 
-        # in case it is not in path already
-        if user_path not in sys.path:
-            sys.path.append(user_path)
 
-    def execute(self, context):
-        python_path = get_python_path()
+def render_scene(scn, directory):
+    """Renders scene as JPEG image into directory"""
+    # shared text objects hold values of the slide shown in window
+    fields.refresh(scn)
+    scn.render.filepath = os.path.join(directory, scn.name)
+    scn.render.image_settings.file_format = "JPEG"
+    bpy.ops.render.render(write_still=True, use_viewport=True, scene=scn.name)
+
+
+def launch_workers(names, directory, workers, engine):
+    """Starts background Blender processes rendering scenes with given names"""
+    # workers read .blend from disk, save current state including unsaved changes
+    blend_path = os.path.join(tempfile.mkdtemp(prefix="bslides_"), "export.blend")
+    bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
 
-        subprocess.call([str(python_path), "-m", "ensurepip", "--user"])
+    # spread slides evenly, each process gets every n-th slide
+    workers = max(1, min(workers, len(names)))
+    chunks = [names[i::workers] for i in range(workers)]
+    threads = max(1, (os.cpu_count() or 1) // workers)
 
-        subprocess.call(
-            [str(python_path), "-m", "pip", "install", "--user", "--upgrade", "pip"]
+    cmd = [
+        bpy.app.binary_path,
+        "--background",
+        blend_path,
+        "--python-exit-code",
+        "1",
+        "--python",
+        WORKER_SCRIPT,
+        "--",
+        directory,
+        engine,
+        str(threads),
+    ]
+
+    return [subprocess.Popen(cmd + chunk) for chunk in chunks], blend_path
+
+
+def remove_blend_copy(blend_path):
+    """Removes .blend file saved for workers together with its directory"""
+    os.remove(blend_path)
+    os.rmdir(os.path.dirname(blend_path))
+
+
+def format_time(seconds):
+    """Formats duration as minutes and seconds"""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
+
+
+class ExportJob:
+    """Export of slides split into steps, so it can run in modal operator"""
+
+    def __init__(self, addon, scenes):
+        self.scenes = [s.name for s in scenes]
+        self.file_format = addon.file_format
+        self.file_name = addon.file_name
+        self.parallel = addon.parallel_export
+        self.workers = addon.export_workers
+        self.engine = addon.worker_engine
+
+        # pages go straight from render into PDF, there are no images to cache
+        self.in_memory = (
+            addon.in_memory_export and self.file_format == "PDF" and not self.parallel
         )
-        package_name = "Pillow"
-        subprocess.call(
-            [str(python_path), "-m", "pip", "install", "--user", package_name]
+        self.use_cache = addon.use_render_cache and not self.in_memory
+        self.pdf = None
+        # slides exported in memory mode through temporary image files
+        self.temporary_files = []
+
+        # pages are prepared by threads while next slide renders, queue is
+        # bounded so only few pages wait in memory to be written
+        self.threads = addon.encode_threads
+        self.encoder = None
+        self.queue = deque()
+
+        # relative directory of file which was never saved has no base
+        self.directory = bpy.path.abspath(addon.output_directory)
+        if not self.directory:
+            raise ValueError("Choose output directory or save the file first")
+
+        if self.file_format == "PDF":
+            self.render_dir = os.path.join(self.directory, CACHE_DIRECTORY)
+        else:
+            self.render_dir = self.directory
+
+        if not self.in_memory:
+            os.makedirs(self.render_dir, exist_ok=True)
+
+        self.start = time.perf_counter()
+        self.last_done = self.start
+
+        # time spent on every rendered slide, used for ETA
+        self.timings = {}
+
+        self.processes = []
+        self.blend_path = None
+
+        engine = ""
+        if self.parallel and self.engine == "CYCLES":
+            engine = "CYCLES"
+
+        if self.use_cache:
+            self.manifest = load_manifest(self.directory)
+            self.fingerprints = slide_fingerprints(scenes, engine)
+            self.pending = [
+                name
+                for name in self.scenes
+                if not is_cached(
+                    self.manifest,
+                    self.directory,
+                    self.relpath(name),
+                    self.fingerprints[name],
+                )
+            ]
+        else:
+            self.manifest = {}
+            self.pending = list(self.scenes)
+
+        # slides finished before crash or kill are not rendered again,
+        # images are kept only when exporting into files
+        self.journal = None
+        if not self.in_memory:
+            self._resume()
+
+        self.reused = len(self.scenes) - len(self.pending)
+        self.total = len(self.pending)
+
+    def _resume(self):
+        """Skips slides recorded by journal of interrupted export"""
+        self.journal = Journal(
+            self.directory, {"scenes": self.scenes, "format": self.file_format}
         )
 
-        self.report({"INFO"}, "All set and done. PDF export now available")
+        resumed = []
+        for name, entry in self.journal.completed().items():
+            if name not in self.pending:
+                continue
+            if not is_complete_jpeg(self.path(entry["file"]), entry["size"]):
+                continue
+            if self.use_cache and entry["fingerprint"] != self.fingerprints[name]:
+                continue
 
-        return {"FINISHED"}
+            resumed.append(entry)
+            self.pending.remove(name)
+
+            if self.use_cache:
+                self.manifest[entry["file"]] = {"fingerprint": entry["fingerprint"]}
+
+        self.journal.open(resumed)
+
+    def path(self, name):
+        """Returns absolute path of file inside output directory"""
+        return os.path.join(self.directory, name)
+
+    def relpath(self, name):
+        """Returns path of slide image relative to output directory"""
+        return os.path.relpath(
+            os.path.join(self.render_dir, f"{name}.jpg"), self.directory
+        )
+
+    @property
+    def done(self):
+        return len(self.timings)
+
+    def eta(self):
+        """Returns estimated seconds until all slides are rendered"""
+        if not self.timings:
+            return None
+
+        avg = sum(self.timings.values()) / len(self.timings)
+        return avg * len(self.pending)
+
+    def status(self):
+        """Returns text describing progress of export"""
+        text = f"Slide {self.done}/{self.total}"
+
+        eta = self.eta()
+        if eta is not None:
+            text += f", {format_time(eta)} left"
+
+        return text
+
+    def _mark_done(self, name):
+        """Records slide as rendered"""
+        now = time.perf_counter()
+        self.timings[name] = now - self.last_done
+        self.last_done = now
+
+        fingerprint = self.fingerprints[name] if self.use_cache else None
+        if self.use_cache:
+            self.manifest[self.relpath(name)] = {"fingerprint": fingerprint}
+
+        if self.journal:
+            self.journal.record(
+                {
+                    "slide": name,
+                    "file": self.relpath(name),
+                    "size": os.path.getsize(self.path(self.relpath(name))),
+                    "fingerprint": fingerprint,
+                }
+            )
+
+    def step(self):
+        """Renders next slide, returns False when nothing is left to render"""
+        # workers are polled until they exit, even after last image is collected
+        if self.parallel:
+            return self._poll_workers()
+
+        if not self.pending:
+            return False
+
+        name = self.pending.pop(0)
+        self.last_done = time.perf_counter()
+        if self.in_memory:
+            self._render_page(bpy.data.scenes[name])
+        else:
+            render_scene(bpy.data.scenes[name], self.render_dir)
+        self._mark_done(name)
+
+        return bool(self.pending)
+
+    def render_all(self):
+        """Renders all remaining slides without returning in between"""
+        while self.step():
+            if self.parallel:
+                time.sleep(0.1)
+
+    def _submit(self, fn, *args):
+        """Prepares page in thread pool, writes finished pages in slide order"""
+        if self.encoder is None:
+            self.encoder = ThreadPoolExecutor(
+                max_workers=self.threads, thread_name_prefix="bslides_export"
+            )
+
+        self.queue.append(self.encoder.submit(fn, *args))
+
+        # wait for the oldest page only when queue is full
+        while self.queue and (
+            len(self.queue) > self.threads or self.queue[0].done()
+        ):
+            self.pdf.add_page(self.queue.popleft().result())
+
+    def _drain(self):
+        """Writes all queued pages and stops thread pool"""
+        while self.queue:
+            self.pdf.add_page(self.queue.popleft().result())
+
+        if self.encoder:
+            self.encoder.shutdown()
+            self.encoder = None
+
+    def _render_page(self, scn):
+        """Renders scene straight into next page of PDF"""
+        if self.pdf is None:
+            self.pdf = PdfWriter(self.path(f"{self.file_name}.PDF"), resolution=100.0)
+
+        colorspace = view_colorspace(scn)
+        if colorspace is not None:
+            fields.refresh(scn)
+            try:
+                width, height, pixels = render_pixels(scn, colorspace)
+            except ValueError:
+                # view transform is missing from color management config
+                pass
+            else:
+                view = scn.view_settings
+                self._submit(
+                    encode_page,
+                    pixels,
+                    width,
+                    height,
+                    view.exposure,
+                    view.gamma,
+                    bool(colorspace),
+                )
+                return
+
+        # looks, curves or other displays are applied only when image is saved,
+        # such slide goes through local temporary directory, not output directory
+        self.temporary_files.append(scn.name)
+        render_scene(scn, bpy.app.tempdir)
+        img_path = os.path.join(bpy.app.tempdir, f"{scn.name}.jpg")
+        with open(img_path, "rb") as f:
+            data = f.read()
+        os.remove(img_path)
+
+        self._submit(jpeg_page, data)
+
+    def _poll_workers(self):
+        """Starts workers on first call, then collects slides they rendered"""
+        if not self.processes:
+            if not self.pending:
+                return False
+
+            # stale images of changed slides would look like finished ones
+            for name in self.pending:
+                if os.path.exists(self.path(self.relpath(name))):
+                    os.remove(self.path(self.relpath(name)))
+
+            self.processes, self.blend_path = launch_workers(
+                self.pending, self.render_dir, self.workers, self.engine
+            )
+
+        # check exit first, so images written right before exit are collected
+        running = any(p.poll() is None for p in self.processes)
+
+        for name in list(self.pending):
+            if is_complete_jpeg(self.path(self.relpath(name))):
+                self.pending.remove(name)
+                self._mark_done(name)
+
+        if running:
+            return True
+
+        failed = [p for p in self.processes if p.returncode != 0]
+        self._stop_workers()
+
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} of {len(self.processes)} export workers failed"
+            )
+        if self.pending:
+            raise RuntimeError(f"{len(self.pending)} slides were not rendered")
+
+        return False
+
+    def _stop_workers(self):
+        """Terminates running workers and removes their .blend file"""
+        for p in self.processes:
+            if p.poll() is None:
+                p.terminate()
+                p.wait()
+
+        if self.blend_path:
+            remove_blend_copy(self.blend_path)
+            self.blend_path = None
+
+    def restore_fields(self):
+        """Shared text fields show slide in window again after rendering others"""
+        fields.refresh(bpy.context.scene)
+
+    def cancel(self):
+        """Stops export, slides rendered so far are kept"""
+        self._stop_workers()
+        self.restore_fields()
+
+        self.queue.clear()
+        if self.encoder:
+            self.encoder.shutdown()
+            self.encoder = None
+
+        if self.pdf:
+            self.pdf.discard()
+
+        # journal stays, next export continues where this one stopped
+        if self.journal:
+            self.journal.close()
+
+        if self.use_cache:
+            save_manifest(self.directory, self.manifest)
+
+    def finish(self):
+        """Assembles output from rendered slides, returns its size in bytes"""
+        self.restore_fields()
+        if self.use_cache:
+            save_manifest(self.directory, self.manifest)
+
+        if self.in_memory:
+            self._drain()
+            self.pdf.close()
+            return os.path.getsize(self.pdf.filepath)
+
+        if self.file_format != "PDF":
+            self.journal.remove()
+            return sum(os.path.getsize(self.path(self.relpath(n))) for n in self.scenes)
+
+        # pages are streamed into file one by one, memory does not grow
+        # with number of slides, threads read images ahead of writing
+        self.pdf = PdfWriter(self.path(f"{self.file_name}.PDF"), resolution=100.0)
+        with self.pdf:
+            for name in self.scenes:
+                self._submit(jpeg_file_page, self.path(self.relpath(name)))
+            self._drain()
+
+        # journal is removed only now, crash during assembly resumes with it
+        self.journal.remove()
+
+        if not self.use_cache:
+            for name in self.scenes:
+                os.remove(self.path(self.relpath(name)))
+
+        return os.path.getsize(self.pdf.filepath)
+
+
+# export running in modal operator, shown in Export panel
+active_job = None
+
+# batch export of many .blend files, shown in Export panel
+active_batch = None
 
 
 class BSLIDES_OT_export_images(Operator):
@@ -69,60 +466,222 @@ class BSLIDES_OT_export_images(Operator):
 
     @classmethod
     def poll(cls, context):
-        # Pillow is necessary for operator to work
+        return active_job is None
+
+    def create_job(self, context):
+        """Returns new export job or None when there is nothing to export"""
+        addon = context.window_manager.bslides
+        scenes = selected_scenes(addon)
+
+        if not scenes:
+            self.report({"WARNING"}, "No slides selected for export")
+            return None
+
         try:
-            from PIL import Image
+            return ExportJob(addon, scenes)
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Export failed: {e}")
+            return None
 
-            return True
-        except ModuleNotFoundError:
-            return False
+    def finish(self, job):
+        """Assembles output of finished job and reports the result"""
+        try:
+            size = job.finish()
+        except (OSError, ValueError) as e:
+            self.report({"ERROR"}, f"Export failed: {e}")
+            return {"CANCELLED"}
+
+        self.report(
+            {"INFO"},
+            f"Exported {len(job.scenes)} slides ({job.reused} reused) "
+            f"in {time.perf_counter() - job.start:.1f} s, "
+            f"{size / 1024 / 1024:.1f} MB",
+        )
+
+        if job.temporary_files:
+            self.report(
+                {"WARNING"},
+                f"{len(job.temporary_files)} slides went through temporary image "
+                "files, their color management can not be applied in memory",
+            )
+
+        return {"FINISHED"}
 
     def execute(self, context):
-        addon = context.window_manager.bslides
+        job = self.create_job(context)
+        if job is None:
+            return {"CANCELLED"}
 
-        if addon.visible_slides and addon.hidden_slides:
-            scenes = bpy.data.scenes
-        elif addon.visible_slides:
-            scenes = [s for s in bpy.data.scenes if s.bslides.render_slide]
-        elif addon.hidden_slides:
-            scenes = [s for s in bpy.data.scenes if not s.bslides.render_slide]
-
-        path = lambda name: os.path.join(addon.output_directory, name)
-
-        for scn in scenes:
-            scn.render.filepath = path(scn.name)
-            scn.render.image_settings.file_format = "JPEG"
-            bpy.ops.render.render(write_still=True, use_viewport=True, scene=scn.name)
-
-        if addon.file_format == "PDF":
-            # start new pdf
-            from PIL import Image
-
-            # open exported images
-            scene_images = []
-            for img in scenes:
-                scene_images.append(Image.open(path(f"{img.name}.JPG")))
-
-            # start with first one add all another
-            scene_images[0].save(
-                path(f"{addon.file_name}.PDF"),
-                "PDF",
-                resolution=100.0,
-                save_all=True,
-                append_images=scene_images[1:],
-            )
+        try:
+            job.render_all()
+        except (RuntimeError, OSError) as e:
+            job.cancel()
+            self.report({"ERROR"}, str(e))
+            return {"CANCELLED"}
+
+        return self.finish(job)
+
+    def invoke(self, context, event):
+        global active_job
+
+        job = self.create_job(context)
+        if job is None:
+            return {"CANCELLED"}
+
+        active_job = job
 
-            # close and remove images
-            for img in scene_images:
-                img.close()
-                os.remove(img.filename)
+        wm = context.window_manager
+        wm.progress_begin(0, max(job.total, 1))
+        self._timer = wm.event_timer_add(0.05, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {"RUNNING_MODAL"}
+
+    def stop(self, context):
+        """Removes timer and progress of modal export"""
+        global active_job
+        active_job = None
+
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+    def modal(self, context, event):
+        job = active_job
+
+        if event.type == "ESC":
+            job.cancel()
+            self.stop(context)
+            self.report({"WARNING"}, f"Export cancelled, {job.done} slides rendered")
+            return {"CANCELLED"}
+
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        try:
+            running = job.step()
+        except (RuntimeError, OSError) as e:
+            job.cancel()
+            self.stop(context)
+            self.report({"ERROR"}, str(e))
+            return {"CANCELLED"}
+
+        context.window_manager.progress_update(job.done)
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+        if running:
+            return {"RUNNING_MODAL"}
+
+        self.stop(context)
+        return self.finish(job)
+
+
+class BSLIDES_OT_batch_export(Operator):
+    """Exports every .blend presentation in directory using export settings"""
+
+    bl_idname = "bslides.batch_export"
+    bl_label = "Batch Export"
+
+    directory: StringProperty(
+        name="Presentations Directory",
+        description="Directory with .blend files to export",
+        subtype="DIR_PATH",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return active_batch is None
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        global active_batch
+
+        addon = context.window_manager.bslides
+        try:
+            decks = find_decks(self.directory)
+        except OSError as e:
+            self.report({"ERROR"}, f"Can not read directory: {e}")
+            return {"CANCELLED"}
+
+        if not decks:
+            self.report({"WARNING"}, "No .blend files in directory")
+            return {"CANCELLED"}
+
+        # every deck renders in its own process, decks are the parallel unit
+        options = ["--format", addon.file_format, "--engine", addon.worker_engine]
+        if addon.hidden_slides and not addon.visible_slides:
+            options.append("--only-hidden")
+        elif addon.hidden_slides:
+            options.append("--hidden")
+        if not addon.use_render_cache:
+            options.append("--no-cache")
+        if addon.in_memory_export:
+            options.append("--in-memory")
+
+        output = bpy.path.abspath(addon.output_directory)
+        active_batch = BatchExport(decks, output, addon.export_workers, options)
+
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(0.5, window=context.window)
+        wm.modal_handler_add(self)
+
+        return {"RUNNING_MODAL"}
+
+    def modal(self, context, event):
+        global active_batch
+
+        if event.type == "ESC":
+            # running exports are terminated, report lists what was finished
+            active_batch.cancel()
+            context.window_manager.event_timer_remove(self._timer)
+            try:
+                report = active_batch.report()
+            except OSError as e:
+                self.report({"ERROR"}, f"Batch report not written: {e}")
+            else:
+                done = len(report["decks"]) - report["failed"] - report["cancelled"]
+                self.report(
+                    {"WARNING"}, f"Batch export cancelled, {done} presentations done"
+                )
+            active_batch = None
+            return {"CANCELLED"}
+
+        if event.type != "TIMER":
+            return {"PASS_THROUGH"}
+
+        for area in context.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+        if not active_batch.finished():
+            return {"RUNNING_MODAL"}
+
+        context.window_manager.event_timer_remove(self._timer)
+        report = active_batch.report()
+        active_batch = None
+
+        level = {"WARNING"} if report["failed"] else {"INFO"}
+        self.report(
+            level,
+            f"Exported {len(report['decks']) - report['failed']} presentations, "
+            f"{report['failed']} failed, in {report['seconds']:.1f} s",
+        )
 
         return {"FINISHED"}
 
 
 classes = (
-    BSLIDES_OT_install_packages,
     BSLIDES_OT_export_images,
+    BSLIDES_OT_batch_export,
 )
 
 
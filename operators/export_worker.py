@@ -0,0 +1,42 @@
+# File: export_worker.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Script run by background Blender processes during parallel export
+#
+# Usage:
+#   blender -b file.blend --python export_worker.py -- OUTPUT ENGINE THREADS SCENE...
+
+import os
+import sys
+import bpy
+
+
+def render_scene(scn, directory, engine, threads):
+    """Renders scene as JPEG image into directory"""
+    # workers share CPU, each one renders with its part of threads
+    scn.render.threads_mode = "FIXED"
+    scn.render.threads = threads
+
+    if engine == "CYCLES":
+        # CPU rendering does not need display or GPU on headless machines
+        scn.render.engine = "CYCLES"
+        scn.cycles.device = "CPU"
+
+    # run frame change handlers, e.g. slide number update
+    scn.frame_set(scn.frame_current)
+
+    scn.render.filepath = os.path.join(directory, scn.name)
+    scn.render.image_settings.file_format = "JPEG"
+    bpy.ops.render.render(write_still=True, use_viewport=True, scene=scn.name)
+
+
+def main(argv):
+    args = argv[argv.index("--") + 1 :]
+    directory, engine, threads, names = args[0], args[1], int(args[2]), args[3:]
+
+    for name in names:
+        render_scene(bpy.data.scenes[name], directory, engine, threads)
+
+
+if __name__ == "__main__":
+    main(sys.argv)
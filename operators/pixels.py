@@ -0,0 +1,147 @@
+# File: pixels.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Rendering slides straight into memory
+
+import bpy
+from ..pdf import pixels_page
+
+
+# view transform -> color space applying it for sRGB display, Filmic is the
+# default of blender 2.8 to 3.x, AgX of blender 4.x
+VIEW_COLORSPACES = {
+    "Standard": "",
+    "Filmic": "Filmic sRGB",
+    "AgX": "AgX Base sRGB",
+}
+
+# name of scene linear color space, changed in blender 4.0
+LINEAR_COLORSPACES = ("Linear Rec.709", "Linear")
+
+
+def view_colorspace(scn):
+    """Returns color space applying view transform of scene or None"""
+    # Standard view is applied to raw pixels, its color space is ""
+    view = scn.view_settings
+    if (
+        scn.display_settings.display_device != "sRGB"
+        or view.look != "None"
+        or view.use_curve_mapping
+    ):
+        return None
+
+    return VIEW_COLORSPACES.get(view.view_transform)
+
+
+def set_colorspace(node, prop, names):
+    """Sets first color space from names known to blender, False if none is"""
+    for name in names:
+        try:
+            setattr(node, prop, name)
+            return True
+        except TypeError:
+            continue
+    return False
+
+
+def render_pixels(scn, colorspace=""):
+    """Renders scene, returns width, height and RGBA pixels as array"""
+    # pixels are linear, or display encoded when color space of view is given
+    import numpy as np
+
+    use_nodes = scn.use_nodes
+    use_compositing = scn.render.use_compositing
+
+    # nodes of slide are kept, everything else added here is removed again,
+    # including default nodes of tree created by turning nodes on
+    existing = {n.name for n in scn.node_tree.nodes} if scn.node_tree else set()
+
+    scn.use_nodes = True
+    scn.render.use_compositing = True
+    tree = scn.node_tree
+
+    # render result can not be read from python, viewer node image can
+    viewer = tree.nodes.new("CompositorNodeViewer")
+    viewer.use_alpha = False
+
+    # view what compositor of slide outputs, otherwise plain render
+    composite = next(
+        (n for n in tree.nodes if n.type == "COMPOSITE" and n.name in existing), None
+    )
+    if use_nodes and use_compositing and composite and composite.inputs[0].links:
+        source = composite.inputs[0].links[0].from_socket
+    else:
+        layers = tree.nodes.new("CompositorNodeRLayers")
+        layers.scene = scn
+        source = layers.outputs["Image"]
+
+    try:
+        # exposure goes before view transform, gamma is applied to pixels later
+        if colorspace:
+            exposure = tree.nodes.new("CompositorNodeExposure")
+            exposure.inputs["Exposure"].default_value = scn.view_settings.exposure
+            convert = tree.nodes.new("CompositorNodeConvertColorSpace")
+            if not (
+                set_colorspace(convert, "from_color_space", LINEAR_COLORSPACES)
+                and set_colorspace(convert, "to_color_space", (colorspace,))
+            ):
+                raise ValueError(f"Color space {colorspace} is not available")
+
+            tree.links.new(source, exposure.inputs["Image"])
+            tree.links.new(exposure.outputs["Image"], convert.inputs["Image"])
+            source = convert.outputs["Image"]
+
+        tree.links.new(source, viewer.inputs["Image"])
+        tree.nodes.active = viewer
+
+        bpy.ops.render.render(use_viewport=True, scene=scn.name)
+
+        image = bpy.data.images["Viewer Node"]
+        width, height = image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    finally:
+        for node in [n for n in tree.nodes if n.name not in existing]:
+            tree.nodes.remove(node)
+        scn.use_nodes = use_nodes
+        scn.render.use_compositing = use_compositing
+
+    return width, height, pixels
+
+
+def to_srgb_bytes(pixels, width, height, exposure=0.0, gamma=1.0, encoded=False):
+    """Returns 8-bit RGB rows top to bottom, linear pixels get standard view"""
+    import numpy as np
+
+    # blender stores rows from bottom, alpha is dropped just like in JPEG
+    rgb = pixels.reshape(height, width, 4)[::-1, :, :3]
+    if not encoded:
+        rgb = rgb * 2.0 ** exposure
+
+    rgb = np.clip(rgb, 0.0, 1.0)
+    if not encoded:
+        rgb = np.where(
+            rgb <= 0.0031308, rgb * 12.92, 1.055 * np.power(rgb, 1.0 / 2.4) - 0.055
+        )
+
+    # blender applies gamma after display transform
+    if gamma != 1.0:
+        rgb = np.power(rgb, 1.0 / gamma)
+
+    return (rgb * 255.0 + 0.5).astype(np.uint8).tobytes()
+
+
+def encode_page(pixels, width, height, exposure=0.0, gamma=1.0, encoded=False):
+    """Converts rendered pixels into PDF page, does not touch blender data"""
+    import numpy as np
+
+    data = to_srgb_bytes(pixels, width, height, exposure, gamma, encoded)
+
+    # PNG Up filter, byte 2 before every row, values wrap around like in PNG
+    rows = np.frombuffer(data, dtype=np.uint8).reshape(height, width * 3)
+    filtered = np.empty((height, width * 3 + 1), dtype=np.uint8)
+    filtered[:, 0] = 2
+    filtered[0, 1:] = rows[0]
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+
+    return pixels_page(filtered.tobytes(), width, height)
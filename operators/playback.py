@@ -0,0 +1,388 @@
+# File: playback.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Slideshow played from pre-rendered slide images
+
+import os
+import bpy
+from bpy.types import Operator
+from ..navigation import slide_index
+from ..fields import fields
+from ..memory import ImageWindow, MEGABYTE
+from ..render_cache import (
+    scene_fingerprint,
+    load_manifest,
+    save_manifest,
+    is_cached,
+)
+from .export import CACHE_DIRECTORY, render_scene
+from .utils import set_slideshow_keymaps
+
+# seconds between loading two prefetched images
+PREFETCH_INTERVAL = 0.02
+
+
+def slide_actions(scene):
+    """Returns actions animating objects of slide or their data"""
+    actions = []
+    for ob in scene.objects:
+        for anim in (ob.animation_data, ob.data and ob.data.animation_data):
+            if anim and anim.action:
+                actions.append(anim.action)
+
+    return actions
+
+
+def action_values(actions):
+    """Returns keyframes and handles of all F-curves of actions"""
+    values = []
+    for action in sorted(actions, key=lambda a: a.name):
+        for fc in action.fcurves:
+            keys = [
+                (
+                    tuple(k.co),
+                    tuple(k.handle_left),
+                    tuple(k.handle_right),
+                    k.interpolation,
+                    k.easing,
+                )
+                for k in fc.keyframe_points
+            ]
+            values.append((action.name, fc.data_path, fc.array_index, keys))
+
+    return values
+
+
+def animation_range(scene):
+    """Returns first and last frame of animated slide, None for still slide"""
+    actions = slide_actions(scene)
+    if not actions:
+        return None
+
+    end = min(scene.frame_end, max(int(a.frame_range[1]) for a in actions))
+    if end <= scene.frame_start:
+        return None
+
+    return scene.frame_start, end
+
+
+def slide_files(scene, render_dir):
+    """Returns paths of images slide is played from, one per frame"""
+    frames = animation_range(scene)
+    if frames is None:
+        return [os.path.join(render_dir, f"{scene.name}.jpg")]
+
+    directory = os.path.join(render_dir, scene.name)
+    return [
+        os.path.join(directory, f"{frame:04d}.jpg")
+        for frame in range(frames[0], frames[1] + 1)
+    ]
+
+
+def slide_fingerprint(scene):
+    """Returns fingerprint of slide, stills match those of local export"""
+    frames = animation_range(scene)
+    if frames is None:
+        return scene_fingerprint(scene, "")
+
+    # only frame shown now is hashed with scene, keys cover the other frames
+    keys = repr(action_values(slide_actions(scene)))
+    return scene_fingerprint(scene, "", "SEQUENCE", frames, keys)
+
+
+def render_sequence(scn, directory):
+    """Renders animation of slide as numbered JPEG images into directory"""
+    frames = animation_range(scn)
+    frame_end = scn.frame_end
+
+    scn.frame_end = frames[1]
+    scn.render.filepath = os.path.join(directory, scn.name, "")
+    scn.render.image_settings.file_format = "JPEG"
+    try:
+        bpy.ops.render.render(animation=True, use_viewport=True, scene=scn.name)
+    finally:
+        scn.frame_end = frame_end
+
+
+class Playback:
+    """Slideshow shown in image editor from pre-rendered images"""
+
+    def __init__(self):
+        self.active = False
+        # visible slide names and images they are played from
+        self.slides = []
+        self.files = {}
+        self.images = {}
+        self.position = 0
+        self.frame = 0
+        self.fps = 24.0
+        self.prefetch_queue = []
+        self.window = ImageWindow()
+
+    def start(self, context, render_dir):
+        """Collects images of visible slides, starts at slide in window"""
+        slide_index.ensure()
+        self.slides = list(slide_index.visible)
+        self.files = {
+            name: slide_files(bpy.data.scenes[name], render_dir)
+            for name in self.slides
+        }
+        self.position = 0
+        if context.scene.name in self.slides:
+            self.position = self.slides.index(context.scene.name)
+        self.active = True
+
+    def space(self):
+        """Returns image editor showing playback or None"""
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == "IMAGE_EDITOR" and window.screen.name == "temp":
+                    return area.spaces.active
+        return None
+
+    def handles(self, context):
+        """Checks whether slideshow operator was called in playback window"""
+        return self.active and context.area and context.area.type == "IMAGE_EDITOR"
+
+    def image(self, filepath):
+        """Returns image of file, loads it on first use"""
+        image = self.images.get(filepath)
+        if image is None:
+            image = bpy.data.images.load(filepath, check_existing=True)
+            self.images[filepath] = image
+        return image
+
+    def show(self, position):
+        """Shows first frame of slide, plays its animation"""
+        self.position = position
+        self.frame = 0
+
+        name = self.slides[position]
+        space = self.space()
+        if space:
+            space.image = self.image(self.files[name][0])
+
+        render = bpy.data.scenes[name].render
+        self.fps = render.fps / render.fps_base
+
+        if bpy.app.timers.is_registered(playback_frame_timer):
+            bpy.app.timers.unregister(playback_frame_timer)
+
+        addon_pref = bpy.context.preferences.addons["blender_slides"].preferences
+        if len(self.files[name]) > 1 and addon_pref.autoplay_animations:
+            bpy.app.timers.register(playback_frame_timer, first_interval=1 / self.fps)
+
+        # frames of slides far from current one are freed, loaded again from disk
+        self.window.update(
+            self.slides,
+            position,
+            self.loaded_images,
+            addon_pref.memory_window,
+            addon_pref.memory_budget * MEGABYTE,
+        )
+
+        self.prefetch()
+
+    def loaded_images(self, name):
+        """Returns images of slide which were already loaded"""
+        return [self.images[f] for f in self.files[name] if f in self.images]
+
+    def step(self, offset):
+        """Shows slide offset from current one, stays at first or last slide"""
+        position = min(max(self.position + offset, 0), len(self.slides) - 1)
+        if position != self.position:
+            self.show(position)
+
+    def next_frame(self):
+        """Shows next frame of animated slide, returns False at its end"""
+        files = self.files[self.slides[self.position]]
+        self.frame += 1
+        if self.frame >= len(files):
+            addon_pref = bpy.context.preferences.addons["blender_slides"].preferences
+            if not addon_pref.loop_animations:
+                return False
+            self.frame = 0
+
+        space = self.space()
+        if space is None:
+            return False
+
+        space.image = self.image(files[self.frame])
+        return True
+
+    def prefetch(self):
+        """Loads images of neighbouring slides into memory while idle"""
+        queue = []
+        for position in (self.position + 1, self.position - 1, self.position):
+            if 0 <= position < len(self.slides):
+                queue.extend(self.files[self.slides[position]])
+
+        # images freed by memory window are loaded again too
+        self.prefetch_queue = [
+            f for f in queue if f not in self.images or not self.images[f].has_data
+        ]
+        if self.prefetch_queue and not bpy.app.timers.is_registered(
+            playback_prefetch_timer
+        ):
+            bpy.app.timers.register(playback_prefetch_timer)
+
+    def prefetch_next(self):
+        """Decodes one queued image, returns False when queue is empty"""
+        if not self.prefetch_queue:
+            return False
+
+        image = self.image(self.prefetch_queue.pop(0))
+        if not image.has_data:
+            image.update()
+
+        return bool(self.prefetch_queue)
+
+    def stop(self):
+        """Stops timers and frees loaded images"""
+        for timer in (playback_frame_timer, playback_prefetch_timer):
+            if bpy.app.timers.is_registered(timer):
+                bpy.app.timers.unregister(timer)
+
+        for image in self.images.values():
+            try:
+                bpy.data.images.remove(image)
+            except ReferenceError:
+                # image was removed together with its window
+                pass
+
+        self.__init__()
+
+
+playback = Playback()
+
+
+def playback_frame_timer():
+    if not playback.active or not playback.next_frame():
+        return None
+    return 1 / playback.fps
+
+
+def playback_prefetch_timer():
+    if not playback.active or not playback.prefetch_next():
+        return None
+    return PREFETCH_INTERVAL
+
+
+class BSLIDES_OT_prepare_playback(Operator):
+    """Renders slides which changed since last playback or export"""
+
+    bl_idname = "bslides.prepare_playback"
+    bl_label = "Prepare Playback"
+
+    def execute(self, context):
+        addon = context.window_manager.bslides
+        directory = bpy.path.abspath(addon.output_directory)
+        render_dir = os.path.join(directory, CACHE_DIRECTORY)
+        os.makedirs(render_dir, exist_ok=True)
+
+        manifest = load_manifest(directory)
+
+        # last image of slide is written last, it marks whole slide as rendered
+        pending = []
+        for scn in bpy.data.scenes:
+            if not scn.bslides.render_slide:
+                continue
+
+            fingerprint = slide_fingerprint(scn)
+            relpath = os.path.relpath(slide_files(scn, render_dir)[-1], directory)
+            if not is_cached(manifest, directory, relpath, fingerprint):
+                pending.append((scn, relpath, fingerprint))
+
+        wm = context.window_manager
+        wm.progress_begin(0, len(pending))
+        try:
+            for idx, (scn, relpath, fingerprint) in enumerate(pending):
+                if animation_range(scn) is None:
+                    render_scene(scn, render_dir)
+                else:
+                    render_sequence(scn, render_dir)
+
+                manifest[relpath] = {"fingerprint": fingerprint}
+                wm.progress_update(idx + 1)
+        finally:
+            save_manifest(directory, manifest)
+            wm.progress_end()
+            # rendering wrote text fields of every slide into shared objects
+            fields.refresh(context.scene)
+
+        self.report({"INFO"}, f"Rendered {len(pending)} slides for playback")
+        return {"FINISHED"}
+
+
+class BSLIDES_OT_run_playback(Operator):
+    """Starts presentation in fullscreen from pre-rendered slides, no live render"""
+
+    bl_idname = "bslides.run_playback"
+    bl_label = "Run Pre-rendered Presentation"
+
+    @classmethod
+    def poll(cls, context):
+        return not playback.active
+
+    def execute(self, context):
+        # slides changed since last run are rendered first
+        bpy.ops.bslides.prepare_playback()
+
+        addon = context.window_manager.bslides
+        render_dir = os.path.join(
+            bpy.path.abspath(addon.output_directory), CACHE_DIRECTORY
+        )
+        playback.start(context, render_dir)
+        if not playback.slides:
+            playback.stop()
+            self.report({"WARNING"}, "There are no visible slides")
+            return {"CANCELLED"}
+
+        try:
+            bpy.ops.screen.userpref_show("INVOKE_DEFAULT")
+            screen = bpy.data.screens["temp"]
+        except KeyError:
+            playback.stop()
+            self.report({"ERROR"}, "An error occured during fullscreen operator.")
+            return {"CANCELLED"}
+
+        area = screen.areas[0]
+        area.type = "IMAGE_EDITOR"
+        space = area.spaces.active
+        space.show_region_header = False
+        space.show_region_toolbar = False
+        space.show_region_ui = False
+
+        playback.show(playback.position)
+
+        bpy.ops.wm.window_fullscreen_toggle()
+
+        region = next(r for r in area.regions if r.type == "WINDOW")
+        override = {"area": area, "region": region}
+        if bpy.ops.image.view_all.poll(override):
+            bpy.ops.image.view_all(override, fit_view=True)
+
+        set_slideshow_keymaps(context, True)
+
+        return {"FINISHED"}
+
+
+classes = (
+    BSLIDES_OT_prepare_playback,
+    BSLIDES_OT_run_playback,
+)
+
+
+def register():
+    for cls in classes:
+        try:
+            bpy.utils.register_class(cls)
+        except ValueError:
+            bpy.utils.unregister_class(cls)
+            bpy.utils.register_class(cls)
+
+
+def unregister():
+    playback.stop()
+    for cls in classes:
+        bpy.utils.unregister_class(cls)
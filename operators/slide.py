@@ -13,13 +13,55 @@ from bpy.props import (
     StringProperty,
     EnumProperty,
     BoolProperty,
+    IntProperty,
 )
 from .utils import (
     set_default_world_background,
     camera_origin,
     camera_center,
     create_title,
+    set_slideshow_keymaps,
+    slideshow_running,
+    parse_ranges,
 )
+from ..navigation import slide_index, slide_number_changes
+from ..fields import fields, SLIDE_NUMBER_TEMPLATE
+from ..prewarm import prewarm, slide_images
+from ..memory import image_window, MEGABYTE
+from ..telemetry import telemetry
+from .playback import playback
+from ..templates import template_registry
+from ..thumbnails import thumbnails
+from ..render_cache import world_values
+
+
+def switch_slide(context, scene):
+    """Shows given slide in window and rewinds it, None keeps current slide"""
+    if scene:
+        context.window.scene = scene
+        context.window_manager.bslides.active_scene_index = slide_index.position[
+            scene.name
+        ]
+
+    context.scene.frame_current = 0
+
+    # shared text objects like slide number show value of slide in window
+    fields.refresh(context.scene)
+
+    addon_pref = context.preferences.addons["blender_slides"].preferences
+    if addon_pref.prewarm_slides:
+        prewarm.schedule(context.scene)
+
+    # images of slides far from current one are freed, only during slideshow
+    number = slide_index.slide_number(context.scene)
+    if number is not None and slideshow_running():
+        image_window.update(
+            slide_index.visible,
+            number - 1,
+            lambda name: slide_images(bpy.data.scenes[name]),
+            addon_pref.memory_window,
+            addon_pref.memory_budget * MEGABYTE,
+        )
 
 
 class BSLIDES_OT_run_slideshow(Operator):
@@ -59,27 +101,7 @@ class BSLIDES_OT_run_slideshow(Operator):
             if bpy.ops.view3d.view_center_camera.poll(override):
                 bpy.ops.view3d.view_center_camera(override)
 
-        # activate keymaps
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.next_slide"
-        ].active = True
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.previous_slide"
-        ].active = True
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.exit_slideshow"
-        ].active = True
-
-        # deactivate default keymap
-        fo = [
-            km
-            for km in bpy.context.window_manager.keyconfigs.default.keymaps[
-                "Frames"
-            ].keymap_items
-            if km.name == "Frame Offset"
-        ]
-        for km in fo:
-            km.active = False
+        set_slideshow_keymaps(context, True)
 
         return {"FINISHED"}
 
@@ -98,28 +120,11 @@ class BSLIDES_OT_exit_slideshow(Operator):
             return {"CANCELLED"}
 
         bpy.ops.wm.window_close("INVOKE_DEFAULT")
+        prewarm.cancel()
+        playback.stop()
+        image_window.clear()
 
-        # deactivate keymaps
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.next_slide"
-        ].active = False
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.previous_slide"
-        ].active = False
-        context.window_manager.keyconfigs.addon.keymaps[0].keymap_items[
-            "bslides.exit_slideshow"
-        ].active = False
-
-        # restore default keymap
-        fo = [
-            km
-            for km in bpy.context.window_manager.keyconfigs.default.keymaps[
-                "Frames"
-            ].keymap_items
-            if km.name == "Frame Offset"
-        ]
-        for km in fo:
-            km.active = True
+        set_slideshow_keymaps(context, False)
 
         return {"FINISHED"}
 
@@ -131,19 +136,13 @@ class BSLIDES_OT_next_slide(Operator):
     bl_label = "Next Slide"
 
     def execute(self, context):
-        current_slide = context.scene
-        scenes = list(bpy.data.scenes)
-        idx = scenes.index(current_slide) + 1
-
-        while idx < len(scenes):
-            if scenes[idx].bslides.render_slide:
-                bpy.context.window.scene = scenes[idx]
-                bpy.context.window_manager.bslides.active_scene_index = idx
-                break
-
-            idx += 1
+        if playback.handles(context):
+            playback.step(1)
+            return {"FINISHED"}
 
-        context.scene.frame_current = 0
+        telemetry.begin(self.bl_idname)
+        switch_slide(context, slide_index.next_slide(context.scene))
+        telemetry.executed(context.scene)
 
         preferences = context.preferences
         addon_pref = preferences.addons["blender_slides"].preferences
@@ -160,18 +159,47 @@ class BSLIDES_OT_previous_slide(Operator):
     bl_label = "Previous Slide"
 
     def execute(self, context):
-        current_slide = context.scene
-        scenes = list(bpy.data.scenes)
-        idx = scenes.index(current_slide) - 1
-        while idx >= 0:
-            if scenes[idx].bslides.render_slide:
-                bpy.context.window.scene = scenes[idx]
-                bpy.context.window_manager.bslides.active_scene_index = idx
-                break
+        if playback.handles(context):
+            playback.step(-1)
+            return {"FINISHED"}
+
+        telemetry.begin(self.bl_idname)
+        switch_slide(context, slide_index.previous_slide(context.scene))
+        telemetry.executed(context.scene)
+
+        preferences = context.preferences
+        addon_pref = preferences.addons["blender_slides"].preferences
+        if addon_pref.autoplay_animations:
+            bpy.ops.screen.animation_play()
+
+        return {"FINISHED"}
+
 
-            idx -= 1
+class BSLIDES_OT_goto_slide(Operator):
+    """Switches active scene to the slide with given number"""
 
-        context.scene.frame_current = 0
+    bl_idname = "bslides.goto_slide"
+    bl_label = "Go To Slide"
+
+    number: IntProperty(
+        name="Slide Number",
+        description="Number of visible slide to switch to",
+        default=1,
+        min=1,
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        scene = slide_index.slide(self.number)
+        if scene is None:
+            self.report({"WARNING"}, f"There is no slide {self.number}")
+            return {"CANCELLED"}
+
+        telemetry.begin(self.bl_idname)
+        switch_slide(context, scene)
+        telemetry.executed(context.scene)
 
         preferences = context.preferences
         addon_pref = preferences.addons["blender_slides"].preferences
@@ -201,8 +229,11 @@ class BSLIDES_OT_new_slide(Operator):
     def execute(self, context):
         scene = bpy.data.scenes.new(name=self.slide_name)
 
-        # create new world
-        if context.scene.world:
+        # new slide shares background of current one, unless copies are preferred
+        addon_pref = context.preferences.addons["blender_slides"].preferences
+        if context.scene.world and addon_pref.shared_background:
+            scene.world = context.scene.world
+        elif context.scene.world:
             scene.world = context.scene.world.copy()
         else:
             world = bpy.data.worlds.new("World")
@@ -283,12 +314,20 @@ class BSLIDES_OT_apply_template(Operator):
     @classmethod
     def poll(cls, context):
         t_name = context.scene.bslides.template
-        return t_name not in [c.name for c in context.scene.collection.children]
+        return t_name != "NONE" and not template_registry.is_linked(
+            context.scene, t_name
+        )
 
     def execute(self, context):
         t_name = context.scene.bslides.template
-        coll = bpy.data.collections[t_name]
+        # template from library is linked into file first time it is applied
+        coll = template_registry.resolve(t_name)
+        if coll is None:
+            self.report({"ERROR"}, f"Template {t_name} can not be loaded")
+            return {"CANCELLED"}
+
         context.scene.collection.children.link(coll)
+        template_registry.invalidate()
         return {"FINISHED"}
 
 
@@ -301,12 +340,176 @@ class BSLIDES_OT_unlink_template(Operator):
     @classmethod
     def poll(cls, context):
         t_name = context.scene.bslides.template
-        return t_name in [c.name for c in context.scene.collection.children]
+        return template_registry.is_linked(context.scene, t_name)
 
     def execute(self, context):
         t_name = context.scene.bslides.template
-        coll = bpy.data.collections[t_name]
+        coll = template_registry.resolve(t_name)
         context.scene.collection.children.unlink(coll)
+        template_registry.invalidate()
+        return {"FINISHED"}
+
+
+def template_items(self, context):
+    return template_registry.enum_items()
+
+
+class SlideSelection:
+    """Properties of operators changing chosen slides"""
+
+    slides: EnumProperty(
+        name="Slides",
+        description="Slides changed by operator",
+        items=(
+            ("ALL", "All", "All slides"),
+            ("VISIBLE", "Visible", "Slides rendered in presentation"),
+            ("HIDDEN", "Hidden", "Hidden slides"),
+            ("RANGE", "Range", "Slides at positions in slide list, e.g. 1-5,8"),
+            ("FILTER", "Filter", "Slides with name containing text"),
+        ),
+        default="ALL",
+    )
+
+    slide_range: StringProperty(
+        name="Range",
+        description="Positions of slides in slide list, e.g. 1-5,8",
+        default="",
+    )
+
+    name_filter: StringProperty(
+        name="Name",
+        description="Text contained in names of slides",
+        default="",
+    )
+
+    def draw_selection(self, layout):
+        layout.prop(self, "slides")
+        if self.slides == "RANGE":
+            layout.prop(self, "slide_range")
+        elif self.slides == "FILTER":
+            layout.prop(self, "name_filter")
+
+    def selection(self):
+        """Returns function checking whether slide with given name is chosen"""
+        slide_index.ensure()
+        slides = self.slides
+        if slides == "ALL":
+            return lambda name: True
+        if slides == "VISIBLE":
+            return lambda name: slide_index.slide_number_of(name) is not None
+        if slides == "HIDDEN":
+            return lambda name: slide_index.slide_number_of(name) is None
+        if slides == "RANGE":
+            positions = parse_ranges(self.slide_range)
+            return lambda name: slide_index.position[name] + 1 in positions
+
+        text = self.name_filter.lower()
+        return lambda name: text in name.lower()
+
+
+class BSLIDES_OT_bulk_template(SlideSelection, Operator):
+    """Applies, swaps or unlinks template on many slides at once"""
+
+    bl_idname = "bslides.bulk_template"
+    bl_label = "Template On Slides"
+    bl_options = {"REGISTER", "UNDO"}
+
+    action: EnumProperty(
+        name="Action",
+        description="What to do with template on chosen slides",
+        items=(
+            ("APPLY", "Apply", "Link template to slides"),
+            ("SWAP", "Swap", "Replace template with another one on slides using it"),
+            ("UNLINK", "Unlink", "Unlink template from slides"),
+        ),
+        default="APPLY",
+    )
+
+    template: EnumProperty(
+        name="Template",
+        description="Template to apply or unlink, replacement when swapping",
+        items=template_items,
+    )
+
+    old_template: EnumProperty(
+        name="Replace",
+        description="Template replaced when swapping",
+        items=template_items,
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return template_registry.enum_items()[0][0] != "NONE"
+
+    def invoke(self, context, event):
+        # start from template chosen in panel
+        if context.scene.bslides.template in template_registry.names:
+            self.template = context.scene.bslides.template
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+
+        layout.row().prop(self, "action", expand=True)
+        if self.action == "SWAP":
+            layout.prop(self, "old_template")
+            layout.prop(self, "template", text="With")
+        else:
+            layout.prop(self, "template")
+
+        self.draw_selection(layout)
+
+    def execute(self, context):
+        try:
+            chosen = self.selection()
+        except ValueError:
+            self.report({"ERROR"}, f"Invalid slide range: {self.slide_range}")
+            return {"CANCELLED"}
+
+        template = template_registry.resolve(self.template)
+        if template is None:
+            self.report({"ERROR"}, "Choose template")
+            return {"CANCELLED"}
+
+        users = template_registry.slides_using(self.template)
+        scenes = bpy.data.scenes
+        changed = 0
+
+        if self.action == "APPLY":
+            # slides already using template are skipped without looking at them
+            for s in scenes:
+                if s.name not in users and chosen(s.name):
+                    s.collection.children.link(template)
+                    thumbnails.invalidate(s.name)
+                    changed += 1
+
+        elif self.action == "UNLINK":
+            # only slides using template are visited
+            for name in list(users):
+                if chosen(name):
+                    scenes[name].collection.children.unlink(template)
+                    thumbnails.invalidate(name)
+                    changed += 1
+
+        else:
+            old = template_registry.resolve(self.old_template)
+            if old is None or old == template:
+                self.report({"ERROR"}, "Choose two different templates")
+                return {"CANCELLED"}
+
+            for name in list(template_registry.slides_using(self.old_template)):
+                if chosen(name):
+                    children = scenes[name].collection.children
+                    children.unlink(old)
+                    if name not in users:
+                        children.link(template)
+                    thumbnails.invalidate(name)
+                    changed += 1
+
+        template_registry.invalidate()
+        self.report({"INFO"}, f"Changed template on {changed} slides")
+
         return {"FINISHED"}
 
 
@@ -355,11 +558,13 @@ class BSLIDES_OT_slide_number(Operator):
     def execute(self, context):
         text_dat = bpy.data.curves.new(type="FONT", name="Slide Number")
         text_obj = bpy.data.objects.new(name="Slide Number", object_data=text_dat)
+        text_dat.bslides.template = SLIDE_NUMBER_TEMPLATE
+        text_dat.bslides.use_fields = True
 
         context.scene.collection.objects.link(text_obj)
         context.scene.bslides.slide_number_enable = True
 
-        context.scene.frame_set(context.scene.frame_current)
+        fields.refresh(context.scene)
 
         return {"FINISHED"}
 
@@ -375,18 +580,31 @@ class BSLIDES_OT_update_slide_number(Operator):
         return "Slide Number" in bpy.data.objects
 
     def execute(self, context):
-        scenes = bpy.data.scenes
-
         slide_number_obj = bpy.data.objects.get("Slide Number")
 
+        # only slides which changed, all of them when changes are unknown,
+        # e.g. after file was reopened
+        if slide_number_changes:
+            scenes = [bpy.data.scenes.get(name) for name in slide_number_changes]
+        else:
+            scenes = bpy.data.scenes
+
         for s in scenes:
+            if s is None:
+                continue
+
+            linked = s.collection.objects.get("Slide Number")
             if s.bslides.slide_number_enable:
                 if "Slide Number" not in s.objects:
                     s.collection.objects.link(slide_number_obj)
-            else:
-                if "Slide Number" in s.objects:
-                    s.collection.objects.unlink(slide_number_obj)
-            s.frame_set(context.scene.frame_current)
+            elif linked:
+                s.collection.objects.unlink(linked)
+
+        slide_number_changes.clear()
+
+        # text is shared by all slides, it is set again whenever slide is shown
+        fields.invalidate("objects")
+        fields.refresh(context.scene)
 
         wm = context.window_manager
         wm.bslides.slide_number_change = False
@@ -434,12 +652,65 @@ class BSLIDES_OT_apply_all_background(Operator):
         scenes_all.remove(scene)
 
         world = scene.world
+        addon_pref = context.preferences.addons["blender_slides"].preferences
 
         for s in scenes_all:
-            if world and s.world.users < 2:
-                bpy.data.worlds.remove(s.world)
-            s.world = world.copy()
+            old = s.world
+            s.world = world if addon_pref.shared_background else world.copy()
+            thumbnails.invalidate(s.name)
+            # world no other slide uses
+            if old and old != world and old.users == 0:
+                bpy.data.worlds.remove(old)
+
+        return {"FINISHED"}
+
+
+class BSLIDES_OT_make_background_unique(Operator):
+    """Gives slide its own copy of shared background, so it can differ"""
+
+    bl_idname = "bslides.make_background_unique"
+    bl_label = "Make Unique"
+    bl_options = {"REGISTER", "UNDO"}
+
+    @classmethod
+    def poll(cls, context):
+        world = context.scene.world
+        return world is not None and world.users > 1
+
+    def execute(self, context):
+        context.scene.world = context.scene.world.copy()
+        return {"FINISHED"}
+
+
+class BSLIDES_OT_merge_backgrounds(Operator):
+    """Merges identical backgrounds of slides into one shared background"""
+
+    bl_idname = "bslides.merge_backgrounds"
+    bl_label = "Merge Identical Backgrounds"
+    bl_options = {"REGISTER", "UNDO"}
 
+    @classmethod
+    def poll(cls, context):
+        return len(bpy.data.worlds) > 1
+
+    def execute(self, context):
+        # most used world of identical ones is kept, fewest users are remapped
+        worlds = sorted(
+            (w for w in bpy.data.worlds if not w.library),
+            key=lambda w: w.users,
+            reverse=True,
+        )
+
+        kept = {}
+        merged = 0
+        for world in worlds:
+            keep = kept.setdefault(repr(world_values(world)), world)
+            if keep != world:
+                world.user_remap(keep)
+                bpy.data.worlds.remove(world)
+                merged += 1
+
+        self.report({"INFO"}, f"Merged {merged} backgrounds")
         return {"FINISHED"}
 
 
@@ -538,25 +809,85 @@ class BSLIDES_OT_3D_cursor_to_center(Operator):
         return {"FINISHED"}
 
 
-class BSLIDES_OT_copy_ob_to_all(Operator):
+def shared_instance(ob):
+    """Returns empty instancing collection with object, shown in many slides"""
+    coll = bpy.data.collections.new(f"{ob.name} Shared")
+    coll.objects.link(ob)
+
+    empty = bpy.data.objects.new(f"{ob.name} Instance", None)
+    empty.instance_type = "COLLECTION"
+    empty.instance_collection = coll
+    return empty
+
+
+def copy_to_slides(ob, scenes, mode):
+    """Puts object into slides as copy, linked object or collection instance"""
+    if mode == "COPY":
+        # object copy shares its data, only object itself is duplicated
+        for s in scenes:
+            s.collection.objects.link(ob.copy())
+        return
+
+    # one object is linked into every slide, editing it changes all of them
+    if mode == "INSTANCE":
+        ob = shared_instance(ob)
+
+    for s in scenes:
+        if s.objects.get(ob.name) != ob:
+            s.collection.objects.link(ob)
+
+
+class BSLIDES_OT_copy_ob_to_all(SlideSelection, Operator):
     """Copies object to all slides"""
 
     bl_idname = "bslides.copy_to_all"
     bl_label = "Copy Object To All Slides"
     bl_options = {"REGISTER", "UNDO"}
 
+    mode: EnumProperty(
+        name="Mode",
+        description="How object is put into other slides",
+        items=(
+            ("COPY", "Copy", "Separate object in every slide, edits stay local"),
+            ("LINK", "Link", "Same object in every slide, edits show everywhere"),
+            (
+                "INSTANCE",
+                "Instance",
+                "Object shown in every slide through collection instance, "
+                "edits show everywhere",
+            ),
+        ),
+        default="COPY",
+    )
+
     @classmethod
     def poll(cls, context):
-        return True
+        return context.object is not None
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.use_property_split = True
+
+        layout.row().prop(self, "mode", expand=True)
+        self.draw_selection(layout)
 
     def execute(self, context):
-        scene = context.scene
-        ob = context.object
+        try:
+            chosen = self.selection()
+        except ValueError:
+            self.report({"ERROR"}, f"Invalid slide range: {self.slide_range}")
+            return {"CANCELLED"}
 
-        for s in bpy.data.scenes:
-            if s is not scene:
-                s.collection.objects.link(ob.copy())
+        scene = context.scene
+        scenes = [s for s in bpy.data.scenes if s != scene and chosen(s.name)]
+        copy_to_slides(context.object, scenes, self.mode)
+        for s in scenes:
+            thumbnails.invalidate(s.name)
 
+        self.report({"INFO"}, f"Object added to {len(scenes)} slides")
         return {"FINISHED"}
 
 
@@ -588,26 +919,92 @@ class BSLIDES_OT_preview_slide(Operator):
         return {"FINISHED"}
 
 
+class BSLIDES_OT_export_switch_timings(Operator):
+    """Saves recorded slide switch timings as CSV or JSON file"""
+
+    bl_idname = "bslides.export_switch_timings"
+    bl_label = "Export Switch Timings"
+
+    filepath: StringProperty(
+        name="File Path",
+        description="File to save timings into",
+        subtype="FILE_PATH",
+    )
+
+    file_format: EnumProperty(
+        name="Format",
+        description="Format of saved timings",
+        items=(
+            ("CSV", "CSV", "Every switch on its own row"),
+            ("JSON", "JSON", "Every switch with per slide summary"),
+        ),
+        default="CSV",
+    )
+
+    @classmethod
+    def poll(cls, context):
+        return len(telemetry.records) > 0
+
+    def invoke(self, context, event):
+        self.filepath = f"bslides_timings.{self.file_format.lower()}"
+        context.window_manager.fileselect_add(self)
+        return {"RUNNING_MODAL"}
+
+    def execute(self, context):
+        filepath = bpy.path.ensure_ext(
+            bpy.path.abspath(self.filepath), f".{self.file_format.lower()}"
+        )
+
+        try:
+            if self.file_format == "CSV":
+                telemetry.write_csv(filepath)
+            else:
+                telemetry.write_json(filepath)
+        except OSError as e:
+            self.report({"ERROR"}, f"Could not save timings: {e}")
+            return {"CANCELLED"}
+
+        self.report({"INFO"}, f"Saved {len(telemetry.records)} switches")
+        return {"FINISHED"}
+
+
+class BSLIDES_OT_clear_switch_timings(Operator):
+    """Forgets all recorded slide switch timings"""
+
+    bl_idname = "bslides.clear_switch_timings"
+    bl_label = "Clear Switch Timings"
+
+    def execute(self, context):
+        telemetry.clear()
+        return {"FINISHED"}
+
+
 classes = (
     BSLIDES_OT_run_slideshow,
     BSLIDES_OT_exit_slideshow,
     BSLIDES_OT_next_slide,
     BSLIDES_OT_previous_slide,
+    BSLIDES_OT_goto_slide,
     BSLIDES_OT_new_slide,
     BSLIDES_OT_remove_slide,
     BSLIDES_OT_new_presentation,
     BSLIDES_OT_apply_template,
     BSLIDES_OT_unlink_template,
+    BSLIDES_OT_bulk_template,
     BSLIDES_OT_new_template,
     BSLIDES_OT_slide_number,
     BSLIDES_OT_update_slide_number,
     BSLIDES_OT_reset_background,
     BSLIDES_OT_apply_all_background,
+    BSLIDES_OT_make_background_unique,
+    BSLIDES_OT_merge_backgrounds,
     BSLIDES_OT_apply_resolution,
     BSLIDES_OT_center,
     BSLIDES_OT_3D_cursor_to_center,
     BSLIDES_OT_copy_ob_to_all,
     BSLIDES_OT_preview_slide,
+    BSLIDES_OT_export_switch_timings,
+    BSLIDES_OT_clear_switch_timings,
 )
 
 
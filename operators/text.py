@@ -15,6 +15,7 @@ from bpy.props import (
 )
 from datetime import datetime
 from mathutils import Vector
+from ..fields import fields
 from .utils import (
     camera_center,
     create_title,
@@ -93,6 +94,12 @@ class BSLIDES_OT_generate_date_time(Operator):
         default="24",
     )
 
+    dynamic: BoolProperty(
+        name="Keep Updated",
+        description="Show date of the presentation instead of today's date",
+        default=False,
+    )
+
     @classmethod
     def poll(cls, context):
         return True
@@ -102,6 +109,7 @@ class BSLIDES_OT_generate_date_time(Operator):
         layout.use_property_split = True
 
         layout.prop(self, "separator", text="Date Separator")
+        layout.prop(self, "dynamic")
 
         row = layout.row(heading="Time")
         row.prop(self, "time", text="")
@@ -116,9 +124,7 @@ class BSLIDES_OT_generate_date_time(Operator):
         text_dat.align_x = "CENTER"
 
         spr = self.separator
-
-        now = datetime.today()
-        text_dat.body = now.strftime(f"%d{spr}%m{spr}%Y")
+        date_format = f"%d{spr}%m{spr}%Y"
 
         if self.time_new_line:
             spr = "\n"
@@ -127,13 +133,22 @@ class BSLIDES_OT_generate_date_time(Operator):
 
         if self.time:
             if self.time_format == "24":
-                text_dat.body += now.strftime(f"{spr}%H:%M")
+                date_format += f"{spr}%H:%M"
             if self.time_format == "12":
-                text_dat.body += now.strftime(f"{spr}%I:%M %p")
+                date_format += f"{spr}%I:%M %p"
 
         text_obj = bpy.data.objects.new(name="Date", object_data=text_dat)
         context.scene.collection.objects.link(text_obj)
 
+        if self.dynamic:
+            # braces would end the field early
+            date_format = date_format.replace("{", "").replace("}", "")
+            text_dat.bslides.template = f"{{date:{date_format}}}"
+            text_dat.bslides.use_fields = True
+            fields.refresh(context.scene)
+        else:
+            text_dat.body = datetime.today().strftime(date_format)
+
         return {"FINISHED"}
 
 
@@ -8,7 +8,26 @@ from mathutils import (
     Vector,
     Matrix,
 )
-import sys
+
+
+# operators controlling slideshow, their keys are active only during slideshow
+SLIDESHOW_OPERATORS = (
+    "bslides.next_slide",
+    "bslides.previous_slide",
+    "bslides.exit_slideshow",
+)
+
+
+def parse_ranges(text):
+    """Returns set of 1-based positions from text like 1-5,8, raises ValueError"""
+    positions = set()
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        first = int(first)
+        last = int(last) if last else first
+        positions.update(range(first, last + 1))
+
+    return positions
 
 
 def set_default_world_background(world):
@@ -58,18 +77,26 @@ def slide_control_header(self, context):
     row.operator("bslides.next_slide", text="", icon="TRIA_RIGHT_BAR")
     row = self.layout.row(align=True)
     row.operator("bslides.run_slideshow", text="", icon="PLAY")
+    row.operator("bslides.run_playback", text="", icon="IMAGE_DATA")
+
 
+def slideshow_running():
+    """Checks whether slideshow window is open, live or pre-rendered"""
+    return "temp" in bpy.data.screens
 
-def get_python_path():
-    """Returns python path for Blender executable"""
-    version = bpy.app.version
 
-    if version > (2, 91, 0):
-        python_path = sys.executable
-    else:
-        python_path = bpy.app.binary_path_python
+def set_slideshow_keymaps(context, active):
+    """Turns on slideshow keymaps of all editors and frame offset keys off"""
+    wm = context.window_manager
+    for km in wm.keyconfigs.addon.keymaps:
+        for kmi in km.keymap_items:
+            if kmi.idname in SLIDESHOW_OPERATORS:
+                kmi.active = active
 
-    return python_path
+    # arrows would change frame instead of slide
+    for kmi in wm.keyconfigs.default.keymaps["Frames"].keymap_items:
+        if kmi.name == "Frame Offset":
+            kmi.active = not active
 
 
 def create_title(cam, scene):
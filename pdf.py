@@ -0,0 +1,188 @@
+# File: pdf.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Streaming PDF writer used for export
+
+import os
+import zlib
+from collections import namedtuple
+
+# image of one page ready to be written, can be prepared outside main thread
+Page = namedtuple("Page", ("width", "height", "image_entries", "data"))
+
+COLOR_SPACES = {
+    1: "/DeviceGray",
+    3: "/DeviceRGB",
+    # Adobe applications store CMYK JPEG inverted
+    4: "/DeviceCMYK /Decode [1 0 1 0 1 0 1 0]",
+}
+
+
+def jpeg_info(data):
+    """Returns width, height and number of color components of JPEG image"""
+    if data[:2] != b"\xff\xd8":
+        raise ValueError("Not a JPEG image")
+
+    # walk marker segments until frame header is found, no pixels are decoded
+    idx = 2
+    while idx + 4 <= len(data):
+        if data[idx] != 0xFF:
+            raise ValueError("Corrupted JPEG image")
+
+        marker = data[idx + 1]
+
+        # fill bytes and markers without segment length
+        if marker == 0xFF:
+            idx += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            idx += 2
+            continue
+
+        # start of frame, except huffman table, extension and arithmetic coding
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height = int.from_bytes(data[idx + 5 : idx + 7], "big")
+            width = int.from_bytes(data[idx + 7 : idx + 9], "big")
+            return width, height, data[idx + 9]
+
+        # start of scan, frame header has to precede it
+        if marker == 0xDA:
+            break
+
+        idx += 2 + int.from_bytes(data[idx + 2 : idx + 4], "big")
+
+    raise ValueError("JPEG image has no frame header")
+
+
+def jpeg_page(data):
+    """Returns page with JPEG image, data is embedded as it is"""
+    width, height, components = jpeg_info(data)
+    return Page(
+        width,
+        height,
+        f"/ColorSpace {COLOR_SPACES[components]} /Filter /DCTDecode",
+        data,
+    )
+
+
+def jpeg_file_page(filepath):
+    """Returns page with JPEG image read from filepath"""
+    with open(filepath, "rb") as f:
+        return jpeg_page(f.read())
+
+
+def pixels_page(data, width, height):
+    """Returns page with PNG Up filtered 8-bit RGB rows, each led by filter byte"""
+    # rows are stored as difference to row above, which compresses far better
+    return Page(
+        width,
+        height,
+        "/ColorSpace /DeviceRGB /Filter /FlateDecode /DecodeParms "
+        f"<< /Predictor 15 /Colors 3 /BitsPerComponent 8 /Columns {width} >>",
+        zlib.compress(data, 6),
+    )
+
+
+class PdfWriter:
+    """Writes PDF file page by page, only current page is held in memory"""
+
+    def __init__(self, filepath, resolution=100.0):
+        self.filepath = filepath
+        self.file = open(filepath, "wb")
+        self.resolution = resolution
+
+        # byte offset of every object, object number is index + 1
+        self.offsets = []
+        self.pages = []
+
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+        # catalog and page tree are written last, reserve their numbers now
+        self.catalog = self._reserve()
+        self.page_tree = self._reserve()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def _reserve(self):
+        """Reserves number for object written later"""
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _write_object(self, num, entries, stream=None):
+        """Writes dictionary object with given entries and optional stream data"""
+        self.offsets[num - 1] = self.file.tell()
+
+        if stream is None:
+            self.file.write(f"{num} 0 obj\n<< {entries} >>\nendobj\n".encode())
+            return
+
+        entries = f"{entries} /Length {len(stream)}".strip()
+        self.file.write(f"{num} 0 obj\n<< {entries} >>\nstream\n".encode())
+        self.file.write(stream)
+        self.file.write(b"\nendstream\nendobj\n")
+
+    def add_page(self, page):
+        """Adds page made of single image"""
+        image = self._reserve()
+        content = self._reserve()
+        page_num = self._reserve()
+
+        # page size in points, image pixels at resolution in dots per inch
+        w = page.width * 72.0 / self.resolution
+        h = page.height * 72.0 / self.resolution
+
+        self._write_object(
+            image,
+            f"/Type /XObject /Subtype /Image /Width {page.width} "
+            f"/Height {page.height} /BitsPerComponent 8 {page.image_entries}",
+            page.data,
+        )
+        self._write_object(
+            content,
+            "",
+            f"q {w:.4f} 0 0 {h:.4f} 0 0 cm /Im0 Do Q".encode(),
+        )
+        self._write_object(
+            page_num,
+            f"/Type /Page /Parent {self.page_tree} 0 R "
+            f"/MediaBox [0 0 {w:.4f} {h:.4f}] "
+            f"/Resources << /XObject << /Im0 {image} 0 R >> >> "
+            f"/Contents {content} 0 R",
+        )
+
+        self.pages.append(page_num)
+
+    def discard(self):
+        """Closes and removes unfinished file"""
+        self.file.close()
+        os.remove(self.filepath)
+
+    def close(self):
+        """Writes page tree, cross-reference table and closes the file"""
+        kids = " ".join(f"{p} 0 R" for p in self.pages)
+        self._write_object(
+            self.page_tree,
+            f"/Type /Pages /Kids [{kids}] /Count {len(self.pages)}",
+        )
+        self._write_object(
+            self.catalog, f"/Type /Catalog /Pages {self.page_tree} 0 R"
+        )
+
+        xref = self.file.tell()
+        self.file.write(f"xref\n0 {len(self.offsets) + 1}\n".encode())
+        self.file.write(b"0000000000 65535 f \n")
+        for offset in self.offsets:
+            self.file.write(f"{offset:010d} 00000 n \n".encode())
+
+        self.file.write(
+            f"trailer\n<< /Size {len(self.offsets) + 1} /Root {self.catalog} 0 R >>\n"
+            f"startxref\n{xref}\n%%EOF\n".encode()
+        )
+        self.file.close()
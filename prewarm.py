@@ -0,0 +1,129 @@
+# File: prewarm.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Evaluates neighbouring slides ahead of switching to them
+
+import time
+import bpy
+from .navigation import slide_index
+from .telemetry import telemetry
+
+# seconds between warming two slides, key presses are handled in between
+PREWARM_INTERVAL = 0.05
+
+# seconds after switch before warming starts, first frame of slide goes first
+PREWARM_DELAY = 0.2
+
+
+def slide_images(scene):
+    """Returns images used by materials and world of scene"""
+    trees = []
+    if scene.world and scene.world.node_tree:
+        trees.append(scene.world.node_tree)
+
+    for ob in scene.objects:
+        for slot in ob.material_slots:
+            mat = slot.material
+            if mat and mat.use_nodes and mat.node_tree:
+                trees.append(mat.node_tree)
+
+    images = set()
+    while trees:
+        tree = trees.pop()
+        for node in tree.nodes:
+            if node.type == "TEX_IMAGE" and node.image:
+                images.add(node.image)
+            elif node.type == "GROUP" and node.node_tree:
+                trees.append(node.node_tree)
+
+    return images
+
+
+def warm_slide(scene, load_images=True):
+    """Evaluates depsgraph of scene and loads its images, returns seconds taken"""
+    start = time.perf_counter()
+
+    # evaluates modifiers, text to curve conversion, drivers, ...
+    # result stays in depsgraph of scene which window uses after switch
+    for view_layer in scene.view_layers:
+        view_layer.update()
+
+    if not load_images:
+        return time.perf_counter() - start
+
+    # reads and decodes image files, upload to GPU happens on first draw
+    for image in slide_images(scene):
+        if not image.has_data:
+            try:
+                image.update()
+            except RuntimeError:
+                # missing or unreadable file, slide shows it as pink anyway
+                pass
+
+    return time.perf_counter() - start
+
+
+class Prewarm:
+    """Slides waiting to be evaluated while slideshow is idle"""
+
+    def __init__(self):
+        self.queue = []
+
+    def schedule(self, scene):
+        """Queues neighbours of slide shown in window"""
+        # next slide is the likely one, it goes first, slide which is
+        # already evaluated costs almost nothing to warm again
+        neighbours = (
+            slide_index.next_slide(scene),
+            slide_index.previous_slide(scene),
+        )
+        self.queue = [s.name for s in neighbours if s]
+
+        if self.queue and not bpy.app.timers.is_registered(prewarm_timer):
+            bpy.app.timers.register(prewarm_timer, first_interval=PREWARM_DELAY)
+
+    def tick(self):
+        """Warms one slide per call, unregisters itself when queue is empty"""
+        while self.queue:
+            scene = bpy.data.scenes.get(self.queue.pop(0))
+            if scene is not None:
+                # images of neighbours would be freed right away without window
+                preferences = bpy.context.preferences
+                addon_pref = preferences.addons["blender_slides"].preferences
+                with telemetry.ignore():
+                    warm_slide(scene, load_images=addon_pref.memory_window > 0)
+                break
+
+        return PREWARM_INTERVAL if self.queue else None
+
+    def cancel(self):
+        self.queue.clear()
+        if bpy.app.timers.is_registered(prewarm_timer):
+            bpy.app.timers.unregister(prewarm_timer)
+
+
+prewarm = Prewarm()
+
+
+def prewarm_timer():
+    # timers are matched by identity, bound method would be new object each time
+    return prewarm.tick()
+
+
+def measure_switches(use_prewarm=True):
+    """Returns seconds needed to evaluate every visible slide when switched to"""
+    # in background mode switching slide comes down to evaluating its depsgraph,
+    # with prewarm next slide is warmed before switch just like in slideshow
+    slide_index.ensure()
+    names = slide_index.visible
+
+    timings = []
+    for idx, name in enumerate(names):
+        scene = bpy.data.scenes[name]
+        seconds = warm_slide(scene)
+        timings.append({"slide": name, "seconds": seconds})
+
+        if use_prewarm and idx + 1 < len(names):
+            warm_slide(bpy.data.scenes[names[idx + 1]])
+
+    return timings
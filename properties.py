@@ -3,6 +3,7 @@
 # Licence: GPL 3.0
 # Description: Properties used throughout addon
 
+import os
 import bpy
 from bpy.types import PropertyGroup
 from bpy.props import (
@@ -13,6 +14,9 @@ from bpy.props import (
     CollectionProperty,
     PointerProperty,
 )
+from .navigation import slide_index, slide_number_changes
+from .fields import fields
+from .templates import template_registry
 
 
 class FontStyle(PropertyGroup):
@@ -69,6 +73,52 @@ class BSLIDES_PG_wm(PropertyGroup):
         default="JPG",
     )
 
+    use_render_cache: BoolProperty(
+        name="Reuse Unchanged Slides",
+        description="Skip rendering of slides which did not change since last export",
+        default=True,
+    )
+
+    in_memory_export: BoolProperty(
+        name="In Memory",
+        description=(
+            "Put rendered slides straight into PDF without writing images to disk. "
+            "Slides with other than Standard view transform use local temporary files"
+        ),
+        default=False,
+    )
+
+    encode_threads: IntProperty(
+        name="Encoding Threads",
+        description="Number of threads preparing PDF pages while slides render",
+        default=min(4, os.cpu_count() or 1),
+        min=1,
+        max=32,
+    )
+
+    parallel_export: BoolProperty(
+        name="Parallel Export",
+        description="Render slides in background Blender processes",
+        default=False,
+    )
+
+    export_workers: IntProperty(
+        name="Workers",
+        description="Number of background Blender processes used for export",
+        default=os.cpu_count() or 1,
+        min=1,
+    )
+
+    worker_engine: EnumProperty(
+        name="Worker Engine",
+        description="Render engine used by background Blender processes",
+        items=(
+            ("CYCLES", "Cycles CPU", "Render with Cycles on CPU, works without GPU"),
+            ("SCENE", "Scene", "Render with engine set in each slide"),
+        ),
+        default="CYCLES",
+    )
+
     def active_scene_index_update(self, context):
         """Updates active scene index"""
         scenes = bpy.data.scenes
@@ -102,27 +152,24 @@ class BSLIDES_PG_wm(PropertyGroup):
 class BSLIDES_PG_scene(PropertyGroup):
     """Represent all properties registered inside scene in Blender"""
 
+    def render_slide_update(self, context):
+        """Hidden slide changes order of slides"""
+        slide_index.invalidate()
+
+        # numbers come from index, only slide in window shows stale one
+        fields.refresh(context.scene)
+
     render_slide: BoolProperty(
         name="Render Slide",
         default=True,
         description="Render this slide during presentation",
+        update=render_slide_update,
     )
 
     def get_templates(self, context):
         """Fetches all templates inside .blend file"""
-        collections = bpy.data.collections
-        templates = []
-
-        for c in collections:
-            if c.name.lower().startswith("template"):
-                templates.append((c.name, c.name, ""))
-
-        # in case no templates were found in .blend file
-        # blender CAN NOT use empty list
-        if not len(templates):
-            templates.append(("NONE", "Empty", ""))
-
-        return templates
+        # cached list, rebuilt only after collections change
+        return template_registry.enum_items()
 
     template: EnumProperty(
         name="All Templates",
@@ -132,6 +179,8 @@ class BSLIDES_PG_scene(PropertyGroup):
 
     def slide_number_change_update(self, context):
         """Updates slide number"""
+        slide_number_changes.add(self.id_data.name)
+
         wm = context.window_manager
         wm.bslides.slide_number_change = True
 
@@ -142,6 +191,18 @@ class BSLIDES_PG_scene(PropertyGroup):
         update=slide_number_change_update,
     )
 
+    def section_update(self, context):
+        """Section is shown on this and following slides"""
+        fields.invalidate("sections")
+        fields.refresh(context.scene)
+
+    section: StringProperty(
+        name="Section",
+        description="Section starting at this slide, used by {section} text fields",
+        default="",
+        update=section_update,
+    )
+
 
 class BSLIDES_PG_text(PropertyGroup):
     """Represent all properties registered inside text object in Blender"""
@@ -202,6 +263,27 @@ class BSLIDES_PG_text(PropertyGroup):
         update=update_small_caps,
     )
 
+    def update_fields(self, context):
+        fields.invalidate("objects")
+        fields.refresh(context.scene)
+
+    use_fields: BoolProperty(
+        name="Dynamic Text",
+        description="Fill text from template with fields like {slide} or {date}",
+        default=False,
+        update=update_fields,
+    )
+
+    template: StringProperty(
+        name="Template",
+        description=(
+            "Text with fields {slide}, {total}, {title}, {section}, {deck} "
+            "and {date}, e.g. {date:%d.%m.%Y}"
+        ),
+        default="{slide}/{total}",
+        update=update_fields,
+    )
+
 
 classes = (
     FontStyle,
@@ -0,0 +1,308 @@
+# File: render_cache.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Slide fingerprints used to reuse already rendered slides
+
+import hashlib
+import json
+import os
+from array import array
+import bpy
+from .fields import fields, field_template
+
+MANIFEST_NAME = "bslides_manifest.json"
+JOURNAL_NAME = "bslides_journal.jsonl"
+
+# render settings which do not change the rendered image, image settings are
+# hashed on their own without file format
+RENDER_SKIP = {"filepath", "image_settings"}
+
+# node editor only properties
+NODE_SKIP = {"location", "width", "height", "dimensions", "select", "hide"}
+
+# properties every data-block has, e.g. name and number of users
+ID_SKIP = {p.identifier for p in bpy.types.ID.bl_rna.properties}
+
+
+def _value(value):
+    """Converts RNA property value into plain python value"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+
+    if isinstance(value, bpy.types.ID):
+        return value.name
+
+    # nested structs are hashed separately when they matter
+    if hasattr(value, "bl_rna"):
+        return None
+
+    try:
+        return tuple(_value(v) for v in value)
+    except TypeError:
+        return repr(value)
+
+
+def rna_values(struct, skip=(), depth=0):
+    """Returns values of all properties of struct, nested structs up to depth"""
+    # users and session ids of data-block change when it is linked into another
+    # slide or file is reloaded, they do not change the rendered image
+    if isinstance(struct, bpy.types.ID):
+        skip = ID_SKIP.union(skip)
+
+    values = []
+    for prop in struct.bl_rna.properties:
+        name = prop.identifier
+        if name == "rna_type" or name in skip or prop.type == "COLLECTION":
+            continue
+
+        try:
+            value = getattr(struct, name)
+        except AttributeError:
+            continue
+
+        # settings like mist or ambient occlusion are structs of their own
+        nested = hasattr(value, "bl_rna") and not isinstance(value, bpy.types.ID)
+        if depth and nested:
+            values.append((name, rna_values(value, depth=depth - 1)))
+        else:
+            values.append((name, _value(value)))
+
+    return values
+
+
+def node_tree_values(tree):
+    """Returns values of nodes, their inputs and links of node tree"""
+    if not tree:
+        return None
+
+    nodes = []
+    for node in tree.nodes:
+        inputs = [
+            (i.identifier, _value(getattr(i, "default_value", None)))
+            for i in node.inputs
+        ]
+        nodes.append(
+            (node.bl_idname, node.name, rna_values(node, skip=NODE_SKIP), inputs)
+        )
+
+    links = [
+        (
+            l.from_node.name,
+            l.from_socket.identifier,
+            l.to_node.name,
+            l.to_socket.identifier,
+        )
+        for l in tree.links
+    ]
+
+    return nodes, links
+
+
+def material_values(mat):
+    """Returns values describing material look"""
+    if not mat:
+        return None
+
+    return rna_values(mat), node_tree_values(mat.node_tree)
+
+
+def world_values(world):
+    """Returns values describing world look, equal for identical worlds"""
+    if not world:
+        return None
+
+    return rna_values(world, depth=2), node_tree_values(world.node_tree)
+
+
+def object_values(ob, scene):
+    """Returns values describing object and its data as shown in scene"""
+    values = [rna_values(ob)]
+    values.append([(m.type, rna_values(m)) for m in ob.modifiers])
+    values.append([material_values(slot.material) for slot in ob.material_slots])
+
+    # instanced collection is only referenced by name, its objects are shown
+    # in slide as well, e.g. objects shared by copy to slides
+    if ob.instance_type == "COLLECTION" and ob.instance_collection:
+        values.append(
+            [
+                object_values(o, scene)
+                for o in sorted(
+                    ob.instance_collection.all_objects, key=lambda o: o.name
+                )
+            ]
+        )
+
+    data = ob.data
+    if data is None:
+        return values
+
+    if ob.type == "FONT":
+        # body of text with fields differs per slide, its value for slide is used
+        template = field_template(ob)
+        if template is None:
+            values.append(rna_values(data))
+        else:
+            values.append(rna_values(data, skip=("body",)))
+            values.append(fields.evaluate(template, scene))
+    elif ob.type == "MESH":
+        co = array("f", [0.0]) * (len(data.vertices) * 3)
+        data.vertices.foreach_get("co", co)
+        values.append(hashlib.sha1(co.tobytes()).hexdigest())
+        values.append((len(data.edges), len(data.polygons)))
+    else:
+        values.append(rna_values(data))
+
+    return values
+
+
+def color_management_values(scene):
+    """Returns view transform, look, exposure, gamma and curves of scene"""
+    view = scene.view_settings
+    values = [rna_values(scene.display_settings), rna_values(view)]
+
+    # points of curves are collections, rna values skip them
+    if view.use_curve_mapping:
+        values.append(
+            [
+                [(tuple(p.location), p.handle_type) for p in curve.points]
+                for curve in view.curve_mapping.curves
+            ]
+        )
+
+    return values
+
+
+def engine_values(scene):
+    """Returns settings of render engines, e.g. samples, bloom or AO"""
+    values = [rna_values(scene.eevee, depth=1)]
+    if hasattr(scene, "cycles"):
+        values.append(rna_values(scene.cycles, depth=1))
+
+    return values
+
+
+def collection_values(coll):
+    """Returns values of collection and all its child collections"""
+    values = [(coll.name, rna_values(coll))]
+    for child in coll.children:
+        values.extend(collection_values(child))
+
+    return values
+
+
+def scene_fingerprint(scene, *extra):
+    """Returns hash of everything affecting rendered image of scene"""
+    data = [
+        extra,
+        scene.frame_current,
+        rna_values(scene.render, skip=RENDER_SKIP, depth=1),
+        rna_values(scene.render.image_settings, skip=("file_format",)),
+        color_management_values(scene),
+        engine_values(scene),
+        world_values(scene.world),
+        collection_values(scene.collection),
+        scene.camera.name if scene.camera else None,
+    ]
+
+    sha = hashlib.sha1(repr(data).encode())
+    for ob in sorted(scene.objects, key=lambda o: o.name):
+        sha.update(repr(object_values(ob, scene)).encode())
+
+    return sha.hexdigest()
+
+
+def load_manifest(directory):
+    """Returns manifest of rendered slides stored in directory"""
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(directory, manifest):
+    """Stores manifest of rendered slides in directory"""
+    path = os.path.join(directory, MANIFEST_NAME)
+
+    # write whole file first so crash does not leave broken manifest
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(f"{path}.tmp", path)
+
+
+def is_cached(manifest, directory, name, fingerprint):
+    """Checks whether slide was rendered with same fingerprint"""
+    entry = manifest.get(name)
+    return (
+        entry is not None
+        and entry["fingerprint"] == fingerprint
+        and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def is_complete_jpeg(filepath, size=None):
+    """Checks that JPEG file was written whole, optionally with given size"""
+    try:
+        with open(filepath, "rb") as f:
+            start = f.read(2)
+            f.seek(-2, os.SEEK_END)
+            end = f.read(2)
+            actual = f.tell()
+    except OSError:
+        return False
+
+    # start of image and end of image markers
+    return start == b"\xff\xd8" and end == b"\xff\xd9" and size in (None, actual)
+
+
+class Journal:
+    """Append-only record of slides finished by export, survives crashes"""
+
+    def __init__(self, directory, header):
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self.header = header
+        self.file = None
+
+    def completed(self):
+        """Returns entries of slides finished by interrupted run of same export"""
+        entries = []
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    entries.append(json.loads(line))
+        except OSError:
+            return {}
+        except ValueError:
+            # last line was cut off by crash
+            pass
+
+        if not entries or entries[0] != self.header:
+            return {}
+
+        return {e["slide"]: e for e in entries[1:]}
+
+    def open(self, entries=()):
+        """Starts new journal keeping given entries of previous run"""
+        with open(f"{self.path}.tmp", "w") as f:
+            for entry in [self.header, *entries]:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(f"{self.path}.tmp", self.path)
+
+        self.file = open(self.path, "a")
+
+    def record(self, entry):
+        """Stores finished slide, entry is on disk once this returns"""
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def remove(self):
+        """Removes journal of finished export"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,161 @@
+# File: telemetry.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Timings of switching slides, used to find slow slides
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+import bpy
+
+# number of switches kept, oldest ones are dropped
+RING_SIZE = 1000
+
+# seconds after which switch without frame change is recorded anyway
+RECORD_TIMEOUT = 2.0
+
+FIELDS = ("time", "operator", "slide", "execute", "depsgraph", "first_frame")
+
+
+def percentile(values, p):
+    """Returns p-th percentile of sorted values using nearest rank"""
+    if not values:
+        return None
+    rank = max(1, -(-len(values) * p // 100))
+    return values[int(rank) - 1]
+
+
+class Telemetry:
+    """Ring buffer of slide switch timings"""
+
+    def __init__(self, size=RING_SIZE):
+        self.records = deque(maxlen=size)
+        # switch which still waits for depsgraph and first frame
+        self.pending = None
+        self.start = 0.0
+        self.depsgraph_start = None
+        # depth of background work whose evaluation is not part of any switch
+        self.ignoring = 0
+
+        # summary is drawn in panel, computed again only after new records
+        self.version = 0
+        self.summary_version = None
+        self.summary_rows = []
+
+    def begin(self, operator):
+        """Starts timing of switch done by operator"""
+        self.finish()
+
+        self.start = time.perf_counter()
+        self.pending = {
+            "time": time.time(),
+            "operator": operator,
+            "slide": None,
+            "execute": None,
+            "depsgraph": 0.0,
+            "first_frame": None,
+        }
+
+        # timeout counts from latest switch
+        if bpy.app.timers.is_registered(telemetry_timeout):
+            bpy.app.timers.unregister(telemetry_timeout)
+        bpy.app.timers.register(telemetry_timeout, first_interval=RECORD_TIMEOUT)
+
+    def executed(self, scene):
+        """Operator switched to scene"""
+        if self.pending:
+            self.pending["slide"] = scene.name
+            self.pending["execute"] = time.perf_counter() - self.start
+
+    @contextmanager
+    def ignore(self):
+        """Evaluations inside block, e.g. prewarm or thumbnails, are not counted"""
+        self.ignoring += 1
+        try:
+            yield
+        finally:
+            self.ignoring -= 1
+
+    def depsgraph_pre(self):
+        if self.pending and not self.ignoring:
+            self.depsgraph_start = time.perf_counter()
+
+    def depsgraph_post(self):
+        if self.ignoring:
+            return
+        if self.pending and self.depsgraph_start is not None:
+            self.pending["depsgraph"] += time.perf_counter() - self.depsgraph_start
+        self.depsgraph_start = None
+
+    def frame_change(self):
+        """First frame of new slide ends timing of switch"""
+        if self.pending and self.pending["execute"] is not None:
+            self.pending["first_frame"] = time.perf_counter() - self.start
+            self.finish()
+
+    def finish(self):
+        """Moves pending switch into records"""
+        if self.pending is None:
+            return
+
+        if self.pending["slide"] is not None:
+            self.records.append(self.pending)
+            self.version += 1
+
+        self.pending = None
+        self.depsgraph_start = None
+
+    def clear(self):
+        self.records.clear()
+        self.pending = None
+        self.version += 1
+
+    def summary(self):
+        """Returns (slide, count, p50, p95) of switch latency, slowest first"""
+        if self.summary_version == self.version:
+            return self.summary_rows
+
+        latencies = {}
+        for r in self.records:
+            # switch without frame change ends when depsgraph is evaluated
+            latency = r["first_frame"]
+            if latency is None:
+                latency = r["execute"] + r["depsgraph"]
+            latencies.setdefault(r["slide"], []).append(latency)
+
+        rows = []
+        for slide, values in latencies.items():
+            values.sort()
+            rows.append(
+                (slide, len(values), percentile(values, 50), percentile(values, 95))
+            )
+        rows.sort(key=lambda r: r[3], reverse=True)
+
+        self.summary_rows = rows
+        self.summary_version = self.version
+        return rows
+
+    def write_csv(self, filepath):
+        with open(filepath, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+    def write_json(self, filepath):
+        summary = [
+            {"slide": s, "count": n, "p50": p50, "p95": p95}
+            for s, n, p50, p95 in self.summary()
+        ]
+        with open(filepath, "w") as f:
+            json.dump({"switches": list(self.records), "summary": summary}, f, indent=1)
+
+
+telemetry = Telemetry()
+
+
+def telemetry_timeout():
+    # slide without frame change handlers firing is recorded without first frame
+    telemetry.finish()
+    return None
@@ -0,0 +1,192 @@
+# File: templates.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Cached list of templates and slides they are linked to
+
+import os
+import bpy
+
+# owner of collection rename subscription
+msgbus_owner = object()
+
+# blender can not use empty list of enum items
+EMPTY_ITEMS = [("NONE", "Empty", "")]
+
+# identifiers of templates from template library start with it
+LIBRARY_PREFIX = "LIB:"
+
+
+def is_template(collection):
+    return collection.name.lower().startswith("template")
+
+
+def identifier(collection):
+    """Returns identifier of template used in enum and registry"""
+    if collection.library:
+        return LIBRARY_PREFIX + collection.name
+    return collection.name
+
+
+def library_path():
+    """Returns absolute path of template library from preferences or None"""
+    addon_pref = bpy.context.preferences.addons["blender_slides"].preferences
+    path = bpy.path.abspath(addon_pref.template_library)
+    return path if addon_pref.template_library and os.path.isfile(path) else None
+
+
+class TemplateLibrary:
+    """Shared .blend file with templates, linked into decks on first use"""
+
+    def __init__(self):
+        # path and modification time of library when names were read
+        self.stamp = None
+        self.names = ()
+
+    def template_names(self):
+        """Returns names of templates in library, read once per session"""
+        path = library_path()
+        if path is None:
+            return ()
+
+        stamp = (path, os.path.getmtime(path))
+        if stamp != self.stamp:
+            # only reads list of data in file, nothing is linked, file which is
+            # not readable .blend is not read again until it changes
+            self.names = ()
+            self.stamp = stamp
+            try:
+                with bpy.data.libraries.load(path, link=True) as (data_from, _):
+                    self.names = tuple(
+                        n
+                        for n in data_from.collections
+                        if n.lower().startswith("template")
+                    )
+            except OSError:
+                pass
+
+        return self.names
+
+    def link(self, name):
+        """Links template from library into current file, returns collection"""
+        with bpy.data.libraries.load(library_path(), link=True, relative=True) as (
+            data_from,
+            data_to,
+        ):
+            data_to.collections = [name]
+
+        return data_to.collections[0]
+
+
+template_library = TemplateLibrary()
+
+
+class TemplateRegistry:
+    """Templates in .blend file, rebuilt after collections or slides change"""
+
+    def __init__(self):
+        self.valid = False
+        # number of collections and scenes when registry was built
+        self.count = None
+        # enum items, same list is returned until templates change, blender
+        # needs strings of dynamic enum items to stay referenced
+        self.items = EMPTY_ITEMS
+        self.names = ()
+        # template identifier -> (name, library path) of its collection, None
+        # for library template which is not linked yet
+        self.keys = {}
+        # slide name -> names of templates linked to it
+        self.linked = {}
+        # template name -> names of slides it is linked to
+        self.users = {}
+
+    def invalidate(self, *args):
+        self.valid = False
+
+    def ensure(self):
+        """Rebuilds registry when it is out of date, otherwise does nothing"""
+        count = (len(bpy.data.collections), len(bpy.data.scenes))
+        if self.valid and self.count == count:
+            return
+
+        self.keys = {}
+        for c in bpy.data.collections:
+            if is_template(c):
+                self.keys[identifier(c)] = (
+                    c.name,
+                    c.library.filepath if c.library else None,
+                )
+
+        # library templates which are not linked yet
+        for name in template_library.template_names():
+            self.keys.setdefault(LIBRARY_PREFIX + name, None)
+
+        names = tuple(self.keys)
+        if names != self.names:
+            self.names = names
+            self.items = [
+                (n, n, "Linked on first use" if self.keys[n] is None else "")
+                for n in names
+            ] or EMPTY_ITEMS
+
+        self.linked = {}
+        self.users = {n: set() for n in names}
+        for s in bpy.data.scenes:
+            linked = frozenset(
+                identifier(c) for c in s.collection.children if is_template(c)
+            )
+            self.linked[s.name] = linked
+            for name in linked:
+                self.users[name].add(s.name)
+
+        self.count = count
+        self.valid = True
+
+    def resolve(self, name):
+        """Returns collection of template, links library template on first use"""
+        self.ensure()
+        if name not in self.keys:
+            return None
+
+        key = self.keys[name]
+        if key is None:
+            try:
+                collection = template_library.link(name[len(LIBRARY_PREFIX) :])
+            except OSError:
+                # library was replaced by unreadable file since it was listed
+                return None
+            self.invalidate()
+            return collection
+
+        return bpy.data.collections.get(key)
+
+    def enum_items(self):
+        self.ensure()
+        return self.items
+
+    def is_linked(self, scene, name):
+        """Checks whether template is linked to slide"""
+        self.ensure()
+        return name in self.linked.get(scene.name, ())
+
+    def slides_using(self, name):
+        """Returns names of slides template is linked to"""
+        self.ensure()
+        return self.users.get(name, set())
+
+
+template_registry = TemplateRegistry()
+
+
+def subscribe_template_renames():
+    """Invalidates registry whenever any collection is renamed"""
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Collection, "name"),
+        owner=msgbus_owner,
+        args=(),
+        notify=template_registry.invalidate,
+    )
+
+
+def unsubscribe_template_renames():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
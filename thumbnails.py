@@ -0,0 +1,279 @@
+# File: thumbnails.py
+# Author: Ronald Telmanik
+# Licence: GPL 3.0
+# Description: Small previews of slides shown in slide list
+
+import os
+import time
+from collections import OrderedDict, deque
+import bpy
+from .icons import preview_collections
+from .fields import fields
+from .render_cache import scene_fingerprint
+from .telemetry import telemetry
+from .operators.utils import slideshow_running
+
+# width of rendered thumbnail in pixels
+THUMBNAIL_WIDTH = 256
+
+# number of thumbnails kept in preview collection, least recently drawn go first
+THUMBNAIL_CACHE_SIZE = 256
+
+# seconds between rendering two thumbnails
+THUMBNAIL_INTERVAL = 0.1
+
+# number of thumbnail files kept on disk, least recently used are deleted
+THUMBNAIL_DISK_LIMIT = 2048
+
+# render samples of thumbnail, noise does not show at its size
+THUMBNAIL_SAMPLES = 4
+
+# seconds slide has to stay unchanged before its thumbnail is rendered again,
+# e.g. while object is being moved
+THUMBNAIL_SETTLE = 1.0
+
+
+def thumbnail_directory():
+    """Returns directory of thumbnails shared by all .blend files"""
+    return bpy.utils.user_resource("DATAFILES", path="bslides_thumbnails", create=True)
+
+
+def render_thumbnail(scn, filepath):
+    """Renders scene at low resolution and few samples as PNG image"""
+    render = scn.render
+
+    # struct, property and value used for thumbnail, restored afterwards
+    overrides = [
+        (render, "filepath", os.path.splitext(filepath)[0]),
+        (
+            render,
+            "resolution_percentage",
+            max(1, min(100, THUMBNAIL_WIDTH * 100 // render.resolution_x)),
+        ),
+        (render.image_settings, "file_format", "PNG"),
+        (scn.eevee, "taa_render_samples", THUMBNAIL_SAMPLES),
+    ]
+    if hasattr(scn, "cycles"):
+        overrides.append((scn.cycles, "samples", THUMBNAIL_SAMPLES))
+
+    settings = [(struct, prop, getattr(struct, prop)) for struct, prop, _ in overrides]
+    for struct, prop, value in overrides:
+        setattr(struct, prop, value)
+
+    # shared text objects hold values of the slide shown in window
+    fields.refresh(scn)
+    try:
+        bpy.ops.render.render(write_still=True, use_viewport=True, scene=scn.name)
+    finally:
+        for struct, prop, value in settings:
+            setattr(struct, prop, value)
+        fields.refresh(bpy.context.scene)
+
+
+class Thumbnails:
+    """Thumbnails keyed by slide fingerprint, rendered by timer while idle"""
+
+    def __init__(self):
+        # fingerprint -> None, order of use, oldest first
+        self.lru = OrderedDict()
+        # fingerprints of thumbnails stored on disk, read lazily
+        self.on_disk = None
+
+        # slide name -> fingerprint of its latest thumbnail
+        self.slides = {}
+        # slides whose thumbnail matches their content
+        self.fresh = set()
+        # slide name -> time of last change
+        self.changed = {}
+        self.queue = deque()
+        self.queued = set()
+
+    def icon(self, scene):
+        """Returns icon of slide thumbnail or 0, requests missing thumbnail"""
+        name = scene.name
+
+        # outdated thumbnail is shown until new one is ready
+        fingerprint = self.slides.get(name)
+        preview = self.preview(fingerprint) if fingerprint else None
+        if fingerprint and fingerprint not in self.disk_thumbnails():
+            # file was deleted from cache directory, slide is rendered again
+            del self.slides[name]
+            self.fresh.discard(name)
+
+        if name not in self.fresh and name not in self.queued:
+            self.queue.append(name)
+            self.queued.add(name)
+            if not bpy.app.timers.is_registered(thumbnail_timer):
+                bpy.app.timers.register(
+                    thumbnail_timer, first_interval=THUMBNAIL_INTERVAL
+                )
+
+        return preview.icon_id if preview else 0
+
+    def preview(self, fingerprint):
+        """Returns preview of thumbnail, loads it from disk when needed"""
+        pcoll = preview_collections.get("thumbnails")
+        if pcoll is None:
+            return None
+
+        if fingerprint in self.lru:
+            self.lru.move_to_end(fingerprint)
+            return pcoll[fingerprint]
+
+        if fingerprint not in self.disk_thumbnails():
+            return None
+
+        # preview images are read from disk by blender when first drawn,
+        # modification time marks file as recently used for pruning
+        path = os.path.join(thumbnail_directory(), f"{fingerprint}.png")
+        try:
+            os.utime(path)
+        except OSError:
+            self.on_disk.discard(fingerprint)
+            return None
+        preview = pcoll.load(fingerprint, path, "IMAGE")
+        self.lru[fingerprint] = None
+
+        while len(self.lru) > THUMBNAIL_CACHE_SIZE:
+            oldest, _ = self.lru.popitem(last=False)
+            del pcoll[oldest]
+
+        return preview
+
+    def disk_thumbnails(self):
+        """Returns fingerprints of thumbnails on disk, prunes old ones first time"""
+        if self.on_disk is None:
+            self.on_disk = self.prune()
+        return self.on_disk
+
+    def prune(self):
+        """Deletes least recently used thumbnail files over limit"""
+        directory = thumbnail_directory()
+        files = [
+            os.path.join(directory, f)
+            for f in os.listdir(directory)
+            if f.endswith(".png")
+        ]
+        files.sort(key=os.path.getmtime, reverse=True)
+
+        for path in files[THUMBNAIL_DISK_LIMIT:]:
+            try:
+                os.remove(path)
+            except OSError:
+                # file is in use or was removed by other blender instance
+                pass
+
+        return {
+            os.path.splitext(os.path.basename(p))[0]
+            for p in files[:THUMBNAIL_DISK_LIMIT]
+        }
+
+    def invalidate(self, name):
+        """Slide changed, its thumbnail is checked again once change settles"""
+        self.fresh.discard(name)
+        self.changed[name] = time.monotonic()
+
+    def invalidate_users(self, ids):
+        """Slides using any of data-blocks, directly or through others, change"""
+        seen = set(ids)
+        pending = set(ids)
+        while pending:
+            users = bpy.data.user_map(subset=pending)
+            pending = set()
+            for user in set().union(*users.values()):
+                if isinstance(user, bpy.types.Scene):
+                    self.invalidate(user.name)
+                elif user not in seen:
+                    seen.add(user)
+                    pending.add(user)
+
+    def invalidate_instancers(self, objects):
+        """Slides instancing collection with any of objects change"""
+        pending = list(objects)
+        seen = {o.name for o in pending}
+        while pending:
+            instancers = [
+                o
+                for o in bpy.data.objects
+                if o.instance_type == "COLLECTION"
+                and o.instance_collection
+                and o.name not in seen
+                and any(p.name in o.instance_collection.all_objects for p in pending)
+            ]
+            for o in instancers:
+                seen.add(o.name)
+                for s in o.users_scene:
+                    self.invalidate(s.name)
+            # instancer may itself be in collection instanced elsewhere
+            pending = instancers
+
+    def tick(self):
+        """Updates thumbnail of one slide, returns False when queue is empty"""
+        now = time.monotonic()
+        for _ in range(len(self.queue)):
+            name = self.queue.popleft()
+            self.queued.discard(name)
+            scene = bpy.data.scenes.get(name)
+            if scene is None or name in self.fresh:
+                continue
+
+            # slide is being edited, come back to it later
+            if now - self.changed.get(name, 0.0) < THUMBNAIL_SETTLE:
+                self.queue.append(name)
+                self.queued.add(name)
+                continue
+
+            self.update(scene)
+            break
+
+        return bool(self.queue)
+
+    def update(self, scene):
+        """Renders thumbnail of slide unless same content was rendered before"""
+        fingerprint = scene_fingerprint(scene, "THUMBNAIL")
+
+        if fingerprint not in self.disk_thumbnails():
+            path = os.path.join(thumbnail_directory(), f"{fingerprint}.png")
+            try:
+                with telemetry.ignore():
+                    render_thumbnail(scene, path)
+            except RuntimeError:
+                # render is busy, e.g. during export
+                self.queue.append(scene.name)
+                self.queued.add(scene.name)
+                return
+            self.on_disk.add(fingerprint)
+
+        self.slides[scene.name] = fingerprint
+        self.fresh.add(scene.name)
+
+        # timers have no screen in context, redraw sidebar of every window
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == "VIEW_3D":
+                    area.tag_redraw()
+
+    def clear(self):
+        """Forgets slides of previous file, thumbnails themselves stay cached"""
+        self.slides.clear()
+        self.fresh.clear()
+        self.changed.clear()
+        self.queue.clear()
+        self.queued.clear()
+
+    def release(self):
+        """Stops rendering, preview collection itself is freed with icons"""
+        self.clear()
+        self.lru.clear()
+        if bpy.app.timers.is_registered(thumbnail_timer):
+            bpy.app.timers.unregister(thumbnail_timer)
+
+
+thumbnails = Thumbnails()
+
+
+def thumbnail_timer():
+    # renders would stall slideshow, queue waits until it ends
+    if slideshow_running():
+        return THUMBNAIL_SETTLE
+    return THUMBNAIL_INTERVAL if thumbnails.tick() else None
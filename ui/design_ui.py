@@ -6,6 +6,7 @@
 import bpy
 from bpy_extras.node_utils import find_node_input
 from bpy.types import Panel
+from ..templates import template_registry
 
 
 class DesignPanel:
@@ -76,10 +77,17 @@ class BSLIDES_PT_background(DesignPanel, Panel):
 
         layout.separator()
 
+        # changes of shared background show on every slide using it
+        if world and world.users > 1:
+            row = layout.row(align=True)
+            row.label(text=f"Shared by {world.users} slides", icon="LINKED")
+            row.operator("bslides.make_background_unique", text="Make Unique")
+
         row = layout.row(align=True)
         if world:
             row.operator("bslides.apply_all_slide_background", text="Apply to All")
         row.operator("bslides.reset_slide_background", text="Reset")
+        layout.operator("bslides.merge_backgrounds", text="Merge Identical")
 
 
 class BSLIDES_PT_template(DesignPanel, Panel):
@@ -99,11 +107,13 @@ class BSLIDES_PT_template(DesignPanel, Panel):
         row = layout.row(align=True)
         template = context.scene.bslides.template
         if template != "NONE":
-            if template in [c.name for c in context.scene.collection.children]:
+            if template_registry.is_linked(context.scene, template):
                 row.operator("bslides.unlink_template", text="Unlink")
             else:
                 row.operator("bslides.apply_template", text="Apply")
 
+        layout.operator("bslides.bulk_template", text="Template On Slides...")
+
 
 class BSLIDES_PT_slide_ratio(DesignPanel, Panel):
     """Panel for slide ratio"""
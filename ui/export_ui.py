@@ -5,6 +5,7 @@
 
 import bpy
 from bpy.types import Panel
+from ..operators import export
 
 
 class BSLIDES_PT_export(Panel):
@@ -40,9 +41,42 @@ class BSLIDES_PT_export(Panel):
         if addon.file_format == "PDF":
             layout.prop(addon, "file_name", text="File Name")
 
-        if addon.visible_slides or addon.hidden_slides:
+        # slides rendered into memory are not stored, so they can not be reused
+        in_memory = False
+        if addon.file_format == "PDF" and not addon.parallel_export:
+            layout.prop(addon, "in_memory_export", text="In Memory")
+            in_memory = addon.in_memory_export
+
+        if addon.file_format == "PDF":
+            layout.prop(addon, "encode_threads", text="Encoding Threads")
+
+        if not in_memory:
+            layout.prop(addon, "use_render_cache", text="Reuse Unchanged")
+
+        col = layout.column(heading="Parallel")
+        col.prop(addon, "parallel_export", text="Background Workers")
+        if addon.parallel_export:
+            col.prop(addon, "export_workers", text="Workers")
+            col.prop(addon, "worker_engine", text="Engine")
+
+        job = export.active_job
+        if job:
+            layout.use_property_split = False
+            box = layout.box()
+            box.label(text=job.status(), icon="RENDER_STILL")
+            box.label(text="Press Esc to cancel export")
+        elif addon.visible_slides or addon.hidden_slides:
             layout.operator(operator="bslides.export_scenes", text="Export")
 
+        batch = export.active_batch
+        if batch:
+            layout.label(
+                text=f"Presentation {batch.done}/{len(batch.decks)}",
+                icon="RENDER_ANIMATION",
+            )
+        elif addon.visible_slides or addon.hidden_slides:
+            layout.operator(operator="bslides.batch_export", text="Batch Export")
+
 
 classes = (BSLIDES_PT_export,)
 
@@ -9,15 +9,68 @@ from bpy.types import (
     Panel,
     GizmoGroup,
 )
+from bpy.props import (
+    StringProperty,
+    EnumProperty,
+    BoolProperty,
+)
+from ..navigation import slide_filter
+from ..fields import fields
+from ..telemetry import telemetry
+from ..memory import resident_bytes, MEGABYTE
+from ..thumbnails import thumbnails
 
 
 class BSLIDES_UL_slide(UIList):
     """List containing all slides in .blend file and provides basic operations"""
 
+    filter_title: StringProperty(
+        name="Title",
+        description="Only show slides with title containing this text",
+        default="",
+    )
+
+    filter_visibility: EnumProperty(
+        name="Visibility",
+        description="Only show slides which are rendered or hidden",
+        items=(
+            ("ALL", "All", "Show all slides"),
+            ("VISIBLE", "Visible", "Show slides rendered in presentation"),
+            ("HIDDEN", "Hidden", "Show hidden slides"),
+        ),
+        default="ALL",
+    )
+
+    filter_template: StringProperty(
+        name="Template",
+        description="Only show slides using template with name containing this text",
+        default="",
+    )
+
+    sort_by: EnumProperty(
+        name="Sort By",
+        description="Order of slides in list",
+        items=(
+            ("ORDER", "Order", "Order of slides in presentation"),
+            ("NAME", "Name", "Alphabetical order of slide names"),
+            ("TITLE", "Title", "Alphabetical order of slide titles"),
+        ),
+        default="ORDER",
+    )
+
+    sort_reverse: BoolProperty(
+        name="Reverse",
+        description="Reverse order of slides in list",
+        default=False,
+    )
+
     def draw_item(
         self, context, layout, data, item, icon, active_data, active_propname
     ):
-        self.use_filter_invert = False
+        # thumbnail of slide once it is rendered, scene icon until then
+        addon_pref = context.preferences.addons["blender_slides"].preferences
+        if addon_pref.slide_thumbnails:
+            icon = thumbnails.icon(item) or icon
 
         if self.layout_type in {"DEFAULT", "COMPACT"}:
             row = layout.row(align=True)
@@ -37,7 +90,7 @@ class BSLIDES_UL_slide(UIList):
 
             # slide number
             # only show when slide number object is initialized
-            if "Slide Number" in bpy.data.objects:
+            if slide_filter.has_slide_number:
                 icon = (
                     "RADIOBUT_ON"
                     if item.bslides.slide_number_enable
@@ -53,7 +106,49 @@ class BSLIDES_UL_slide(UIList):
 
         elif self.layout_type in {"GRID"}:
             layout.alignment = "CENTER"
-            layout.label(text=item.name, icon_value=icon)
+            col = layout.column(align=True)
+            col.template_icon(icon_value=icon, scale=4.0)
+            col.label(text=item.name)
+
+    def draw_filter(self, context, layout):
+        col = layout.column(align=True)
+        row = col.row(align=True)
+        row.prop(self, "filter_name", text="", icon="VIEWZOOM")
+        row.prop(self, "filter_title", text="", icon="FONT_DATA")
+        row.prop(self, "filter_template", text="", icon="OUTLINER_COLLECTION")
+
+        row = col.row(align=True)
+        row.prop(self, "filter_visibility", expand=True)
+
+        row = col.row(align=True)
+        row.prop(self, "sort_by", expand=True)
+        icon = "SORT_DESC" if self.sort_reverse else "SORT_ASC"
+        row.prop(self, "sort_reverse", text="", icon=icon)
+
+    def filter_items(self, context, data, propname):
+        # whole list is filtered once, not again on redraws without changes
+        options = (
+            self.filter_name,
+            self.filter_title,
+            self.filter_visibility,
+            self.filter_template,
+            self.sort_by,
+            self.sort_reverse,
+        )
+
+        # titles are read only when they are used
+        if self.filter_title or self.sort_by == "TITLE":
+            titles = fields.slide_titles()
+        else:
+            titles = {}
+
+        return slide_filter.filter(
+            getattr(data, propname),
+            options,
+            titles,
+            fields.versions["titles"],
+            self.bitflag_filter_item,
+        )
 
 
 class SlidePanel:
@@ -122,6 +217,69 @@ class BSLIDES_PT_slide_number(SlidePanel, Panel):
         else:
             row.operator("bslides.new_slide_number", text="New Slide Number")
 
+        layout.prop(context.scene.bslides, "section")
+
+
+class BSLIDES_PT_switch_timings(SlidePanel, Panel):
+    """Panel with latency of switching to slides"""
+
+    bl_parent_id = "BSLIDES_PT_slide"
+    bl_label = "Switch Timings"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        rows = telemetry.summary()
+
+        if not rows:
+            layout.label(text="Switch slides to record timings")
+        else:
+            col = layout.column(align=True)
+            row = col.row()
+            row.label(text="Slide")
+            row.label(text="Count")
+            row.label(text="p50 ms")
+            row.label(text="p95 ms")
+
+            # slowest slides are on top
+            for slide, count, p50, p95 in rows:
+                row = col.row()
+                row.label(text=slide)
+                row.label(text=str(count))
+                row.label(text=f"{p50 * 1000:.0f}")
+                row.label(text=f"{p95 * 1000:.0f}")
+
+        row = layout.row(align=True)
+        row.operator(
+            "bslides.export_switch_timings", text="CSV", icon="EXPORT"
+        ).file_format = "CSV"
+        row.operator(
+            "bslides.export_switch_timings", text="JSON", icon="EXPORT"
+        ).file_format = "JSON"
+        row.operator("bslides.clear_switch_timings", text="", icon="TRASH")
+
+
+class BSLIDES_PT_slide_memory(SlidePanel, Panel):
+    """Panel with memory used by images of slides"""
+
+    bl_parent_id = "BSLIDES_PT_slide"
+    bl_label = "Image Memory"
+    bl_options = {"DEFAULT_CLOSED"}
+
+    def draw(self, context):
+        layout = self.layout
+        addon_pref = context.preferences.addons["blender_slides"].preferences
+
+        resident = resident_bytes() / MEGABYTE
+        text = f"Loaded Images: {resident:.0f} MB"
+        if addon_pref.memory_budget:
+            text += f" / {addon_pref.memory_budget} MB"
+        layout.label(text=text)
+
+        col = layout.column(align=True)
+        col.prop(addon_pref, "memory_window")
+        col.prop(addon_pref, "memory_budget", text="Budget (MB)")
+
 
 class BSLIDES_GG_slideshow_control(GizmoGroup):
     """Slideshow control buttons"""
@@ -208,11 +366,22 @@ class BSLIDES_GG_slideshow_control(GizmoGroup):
         }
 
 
+class BSLIDES_GG_playback_control(BSLIDES_GG_slideshow_control):
+    """Slideshow control buttons for playback of pre-rendered slides"""
+
+    bl_idname = "GG_playbackslide"
+    bl_label = "Gizmo button for playback slideshow"
+    bl_space_type = "IMAGE_EDITOR"
+
+
 classes = (
     BSLIDES_UL_slide,
     BSLIDES_PT_slide,
     BSLIDES_PT_slide_number,
+    BSLIDES_PT_switch_timings,
+    BSLIDES_PT_slide_memory,
     BSLIDES_GG_slideshow_control,
+    BSLIDES_GG_playback_control,
 )
 
 
@@ -207,6 +207,30 @@ class BSLIDES_PT_text_color(TextPanel, Panel):
                 layout.prop(mat, "roughness")
 
 
+class BSLIDES_PT_text_fields(TextPanel, Panel):
+    """Panel for dynamic text filled from fields"""
+
+    bl_parent_id = "BSLIDES_PT_text"
+    bl_label = "Fields"
+
+    @classmethod
+    def poll(cls, context):
+        ob = context.object
+        return ob and ob.type == "FONT" and context.mode == "OBJECT"
+
+    def draw_header(self, context):
+        self.layout.prop(context.object.data.bslides, "use_fields", text="")
+
+    def draw(self, context):
+        layout = self.layout
+        props = context.object.data.bslides
+
+        col = layout.column()
+        col.active = props.use_fields
+        col.prop(props, "template", text="")
+        col.label(text="{slide} {total} {title} {section} {deck} {date}")
+
+
 class BSLIDES_PT_insert(TextPanel, Panel):
     """Panel containing insert operators"""
 
@@ -286,6 +310,7 @@ classes = (
     BSLIDES_PT_style,
     BSLIDES_PT_spacing,
     BSLIDES_PT_text_color,
+    BSLIDES_PT_text_fields,
     BSLIDES_PT_insert,
     BSLIDES_UL_font_styles,
     BSLIDES_PT_fonts,